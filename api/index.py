@@ -4,18 +4,21 @@ from mangum import Mangum
 import os
 import sys
 
+# Serverless functions keep a small, quickly released connection pool
+os.environ.setdefault("MONGODB_POOL_PROFILE", "serverless")
+
 # Add server directory to path
 server_path = os.path.join(os.path.dirname(__file__), '..', 'server')
 if server_path not in sys.path:
     sys.path.insert(0, server_path)
 
 try:
-    from routers import auth, contacts, chat, campaigns, templates, sheets, channels, communities, profile, settings as settings_router, status
+    from routers import auth, contacts, chat, campaigns, templates, sheets, channels, communities, profile, settings as settings_router, status, segments
 except ImportError as e:
     print(f"Import error: {e}")
     # Create minimal routers if imports fail
     from fastapi import APIRouter
-    auth = contacts = chat = campaigns = templates = sheets = channels = communities = profile = settings_router = status = type('Router', (), {'router': APIRouter()})()
+    auth = contacts = chat = campaigns = templates = sheets = channels = communities = profile = settings_router = status = segments = type('Router', (), {'router': APIRouter()})()
 
 # Create FastAPI app (no lifespan for serverless)
 app = FastAPI(
@@ -32,6 +35,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Before-Cursor", "X-After-Cursor"],
 )
 
 # Include routers with /api prefix
@@ -46,6 +50,7 @@ app.include_router(communities.router, prefix="/api")
 app.include_router(profile.router, prefix="/api")
 app.include_router(settings_router.router, prefix="/api")
 app.include_router(status.router, prefix="/api")
+app.include_router(segments.router, prefix="/api")
 
 
 @app.get("/api")
@@ -0,0 +1,41 @@
+"""
+Time access token decoding with and without the verified-claims cache
+"""
+
+import sys
+import os
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from jose import jwt
+from config import settings
+from utils.security import create_access_token, decode_access_token, token_cache
+
+
+def time_per_call(fn, token: str, rounds: int) -> float:
+    started = time.perf_counter()
+    for _ in range(rounds):
+        fn(token)
+    return (time.perf_counter() - started) / rounds * 1e6
+
+
+def main(rounds: int = 20000):
+    token = create_access_token({"sub": "0" * 24})
+
+    uncached = time_per_call(
+        lambda t: jwt.decode(t, settings.secret_key, algorithms=[settings.algorithm]),
+        token, rounds
+    )
+
+    token_cache.clear()
+    decode_access_token(token)  # Warm the cache
+    cached = time_per_call(decode_access_token, token, rounds)
+
+    print(f"jwt.decode:                  {uncached:8.2f} us/call")
+    print(f"decode_access_token (cached): {cached:8.2f} us/call")
+    print(f"Speedup: {uncached / cached:.1f}x over {rounds} calls")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import List, Optional
 from functools import lru_cache
 
 
@@ -9,11 +9,20 @@ class Settings(BaseSettings):
     # MongoDB
     mongodb_url: str
     database_name: str
+    mongodb_pool_profile: str = "single-node"  # "serverless", "single-node" or "high-concurrency"
+    mongodb_max_pool_size: Optional[int] = None  # Overrides the profile
+    mongodb_min_pool_size: Optional[int] = None
     
     # Security
     secret_key: str
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 30
+    bcrypt_rounds: int = 12  # Raising this rehashes passwords on next login
+    password_hash_workers: int = 4
+    password_hash_max_queue: int = 64
+    password_hash_timeout_seconds: float = 5.0
+    token_cache_size: int = 100000
+    token_denylist_refresh_seconds: float = 5.0  # How often revocations are reloaded from Mongo
     
     # Google Sheets
     google_service_account_file: str
@@ -27,6 +36,64 @@ class Settings(BaseSettings):
     google_redirect_uri: str = "http://localhost:8000/auth/google/callback"
     frontend_url: str = "http://localhost:3000"
     
+    # Caching
+    cache_bus_enabled: bool = True  # Push invalidations to other workers via MongoDB
+    user_cache_size: int = 50000
+    user_cache_ttl_seconds: int = 60
+    cache_bus_poll_interval_seconds: float = 1.0
+    cache_bus_overlap_seconds: float = 10.0  # How far back each poll re-reads for late commits
+    membership_cache_size: int = 50000
+    membership_cache_ttl_seconds: int = 300
+    
+    # Groups
+    group_fanout_max_members: int = 1000  # Larger groups compute unread counts on read
+    
+    # Sharded counters (members_count / followers_count)
+    counter_shard_count: int = 16
+    counter_cache_ttl_seconds: int = 5
+    counter_reconcile_interval_seconds: int = 300
+    
+    # Channel broadcasts
+    broadcast_batch_size: int = 1000
+    broadcast_fanout_max_followers: int = 100000  # Larger channels store a range marker
+    trending_refresh_interval_seconds: int = 60
+    
+    # Channel deletion reaper
+    channel_reaper_batch_size: int = 1000
+    channel_reaper_pause_seconds: float = 0.1  # Throttle between batches
+    channel_reaper_interval_seconds: int = 30
+    channel_reaper_lease_seconds: int = 120
+    
+    # Channel view analytics
+    view_flush_interval_seconds: int = 10
+    
+    # Status feed
+    status_feed_cache_size: int = 20000
+    status_feed_cache_ttl_seconds: int = 15
+    
+    # Template registry
+    template_cache_size: int = 10000
+    template_cache_ttl_seconds: int = 300
+    
+    # Google Sheets calls run on their own bounded thread pool
+    sheets_max_workers: int = 8
+    sheets_max_queue: int = 32  # Further calls are rejected instead of queued
+    sheets_call_timeout_seconds: float = 30.0
+    sheet_cache_size: int = 16
+    sheet_cache_ttl_seconds: int = 600
+    sheet_cache_max_rows: int = 10000  # Larger sheets are streamed, never cached
+    sheet_version_check_seconds: int = 15  # How long a spreadsheet's modified time is trusted
+    sheet_read_batch_rows: int = 1000  # Rows per A1 range when streaming a sheet
+    
+    # Local sheet files (file:// URLs), one directory per user
+    sheet_local_root: str = "data/sheets"
+    sheet_upload_max_bytes: int = 100 * 1024 * 1024
+    local_sheets_max_workers: int = 4
+    
+    # Incremental sheet sync
+    sheet_sync_poll_seconds: int = 60
+    sheet_sync_lease_seconds: int = 1800
+    
     @property
     def cors_origins_list(self) -> List[str]:
         """Parse CORS origins as a list"""
@@ -1,5 +1,6 @@
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
 from config import settings
+from utils.mongo_pool import POOL_PROFILES, pool_telemetry
 import logging
 
 logger = logging.getLogger(__name__)
@@ -9,48 +10,69 @@ mongodb_client: AsyncIOMotorClient = None
 mongodb: AsyncIOMotorDatabase = None
 
 
-async def get_database() -> AsyncIOMotorDatabase:
-    """Get database connection, creating it if necessary (serverless-friendly)"""
+def pool_options() -> dict:
+    """Connection pool options for the configured profile, with overrides applied"""
+    if settings.mongodb_pool_profile not in POOL_PROFILES:
+        raise ValueError(
+            f"Unknown MongoDB pool profile '{settings.mongodb_pool_profile}'; "
+            f"expected one of {', '.join(POOL_PROFILES)}"
+        )
+    
+    options = dict(POOL_PROFILES[settings.mongodb_pool_profile])
+    if settings.mongodb_max_pool_size is not None:
+        options["maxPoolSize"] = settings.mongodb_max_pool_size
+    if settings.mongodb_min_pool_size is not None:
+        options["minPoolSize"] = settings.mongodb_min_pool_size
+    return options
+
+
+def get_database() -> AsyncIOMotorDatabase:
+    """
+    Get the database instance, creating the client on first use
+    
+    Creating the client does no I/O, so this is safe to call from any
+    handler; long-running servers still connect eagerly in
+    connect_to_mongo, while serverless functions connect lazily here.
+    """
     global mongodb_client, mongodb
     
     if mongodb is None:
-        try:
-            logger.info(f"Connecting to MongoDB at {settings.mongodb_url}")
-            # Initialize client with connection pooling optimized for serverless
-            mongodb_client = AsyncIOMotorClient(
-                settings.mongodb_url,
-                maxPoolSize=10,  # Lower for serverless
-                minPoolSize=1,   # Minimal pool for serverless
-                maxIdleTimeMS=10000,  # Shorter idle time for serverless
-                serverSelectionTimeoutMS=5000  # Faster timeout
-            )
-            mongodb = mongodb_client[settings.database_name]
-            
-            # Test connection
-            await mongodb_client.admin.command('ping')
-            logger.info(f"Successfully connected to MongoDB database: {settings.database_name}")
-            
-        except Exception as e:
-            logger.error(f"Failed to connect to MongoDB: {e}")
-            raise
+        options = pool_options()
+        logger.info(f"Creating MongoDB client with the {settings.mongodb_pool_profile} pool profile: {options}")
+        mongodb_client = AsyncIOMotorClient(
+            settings.mongodb_url,
+            event_listeners=[pool_telemetry],
+            **options
+        )
+        mongodb = mongodb_client[settings.database_name]
     
     return mongodb
 
 
 async def connect_to_mongo():
     """Connect to MongoDB and initialize database"""
-    global mongodb
-    mongodb = await get_database()
+    db = get_database()
+    
+    try:
+        # Test connection
+        await db.client.admin.command('ping')
+        logger.info(f"Successfully connected to MongoDB database: {settings.database_name}")
+    except Exception as e:
+        logger.error(f"Failed to connect to MongoDB: {e}")
+        raise
+    
     # Create indexes
     await create_indexes()
 
 
 async def close_mongo_connection():
     """Close MongoDB connection"""
-    global mongodb_client
+    global mongodb_client, mongodb
     
     if mongodb_client:
         mongodb_client.close()
+        mongodb_client = None
+        mongodb = None
         logger.info("Closed MongoDB connection")
 
 
@@ -65,6 +87,10 @@ async def create_indexes():
         await mongodb.contacts.create_index([("user_id", 1), ("phone", 1)])
         await mongodb.contacts.create_index("user_id")
         await mongodb.contacts.create_index("email")
+        await mongodb.contacts.create_index([("user_id", 1), ("tags", 1)])  # Multikey, for segments
+        
+        # Segments collection
+        await mongodb.segments.create_index([("user_id", 1), ("created_at", -1)])
         
         # Contact relationships collection (bidirectional contacts)
         await mongodb.contact_relationships.create_index([("user_id", 1), ("contact_user_id", 1)], unique=True)
@@ -89,6 +115,9 @@ async def create_indexes():
         await mongodb.campaigns.create_index("created_at")
         await mongodb.campaigns.create_index([("user_id", 1), ("created_at", -1)])
         
+        # Campaign recipients collection (one row per contact messaged)
+        await mongodb.campaign_recipients.create_index([("campaign_id", 1), ("_id", 1)])
+        
         # Groups collection
         await mongodb.groups.create_index("creator_id")
         await mongodb.groups.create_index("community_id")
@@ -103,7 +132,7 @@ async def create_indexes():
         # Group messages collection
         await mongodb.group_messages.create_index("group_id")
         await mongodb.group_messages.create_index("created_at")
-        await mongodb.group_messages.create_index([("group_id", 1), ("created_at", -1)])
+        await mongodb.group_messages.create_index([("group_id", 1), ("created_at", -1), ("_id", -1)])  # Keyset pagination
         
         # Communities collection
         await mongodb.communities.create_index("creator_id")
@@ -114,27 +143,65 @@ async def create_indexes():
         await mongodb.community_members.create_index([("community_id", 1), ("user_id", 1)], unique=True)
         await mongodb.community_members.create_index("user_id")
         await mongodb.community_members.create_index("community_id")
+        await mongodb.community_members.create_index([("user_id", 1), ("joined_at", -1)])
         
         # Channels collection
         await mongodb.channels.create_index("creator_id")
         await mongodb.channels.create_index("verified")
         await mongodb.channels.create_index("created_at")
         await mongodb.channels.create_index([("verified", 1), ("created_at", -1)])
+        await mongodb.channels.create_index([("followers_count", -1)])
+        await mongodb.channels.create_index([("deleted_at", 1)], sparse=True)
+        # Lower-cased name for index-backed prefix search (backfill older channels)
+        await mongodb.channels.update_many(
+            {"name_lower": {"$exists": False}},
+            [{"$set": {"name_lower": {"$toLower": "$name"}}}]
+        )
+        await mongodb.channels.create_index("name_lower")
         
         # Channel followers collection
         await mongodb.channel_followers.create_index([("channel_id", 1), ("user_id", 1)], unique=True)
         await mongodb.channel_followers.create_index("user_id")
         await mongodb.channel_followers.create_index("channel_id")
+        await mongodb.channel_followers.create_index([("channel_id", 1), ("_id", 1)])
+        
+        # Channel view sketches (HyperLogLog registers per post and per channel-day)
+        await mongodb.channel_message_views.create_index("channel_id")
+        await mongodb.channel_reach_daily.create_index([("channel_id", 1), ("day", -1)], unique=True)
+        
+        # Channel deliveries collection (per-follower broadcast tracking)
+        await mongodb.channel_deliveries.create_index([("message_id", 1), ("user_id", 1)], unique=True)
+        await mongodb.channel_deliveries.create_index([("user_id", 1), ("delivered_at", -1)])
+        await mongodb.channel_deliveries.create_index("channel_id")
         
         # Channel messages collection
         await mongodb.channel_messages.create_index("channel_id")
         await mongodb.channel_messages.create_index("created_at")
-        await mongodb.channel_messages.create_index([("channel_id", 1), ("created_at", -1)])
+        await mongodb.channel_messages.create_index([("channel_id", 1), ("created_at", -1), ("_id", -1)])  # Keyset pagination
+        
+        # Sheet syncs (row hashes keyed by sync and row position)
+        await mongodb.sheet_syncs.create_index("user_id")
+        await mongodb.sheet_syncs.create_index("next_run_at", sparse=True)
+        await mongodb.sheet_sync_rows.create_index([("sync_id", 1), ("row", 1)], unique=True)
+        
+        # Revoked access tokens, kept until the tokens would have expired
+        await mongodb.token_revocations.create_index("expires_at", expireAfterSeconds=0)
+        await mongodb.token_revocations.create_index("created_at")
         
         # Templates collection
         await mongodb.templates.create_index("category")
         await mongodb.templates.create_index("status")
         await mongodb.templates.create_index([("category", 1), ("status", 1)])
+        await mongodb.templates.create_index([("user_id", 1), ("created_at", 1)])
+        
+        # Status updates collection (expired statuses purged by TTL)
+        await mongodb.status_updates.create_index("expires_at", expireAfterSeconds=0)
+        await mongodb.status_updates.create_index("created_at")
+        await mongodb.status_updates.create_index([("user_id", 1), ("expires_at", -1)])
+        
+        # Status views collection (one row per viewer, purged with the status)
+        await mongodb.status_views.create_index([("status_id", 1), ("viewer_id", 1)], unique=True)
+        await mongodb.status_views.create_index("expires_at", expireAfterSeconds=0)
         
         # Media files collection
         await mongodb.media_files.create_index("user_id")
@@ -142,12 +209,13 @@ async def create_indexes():
         await mongodb.media_files.create_index("created_at")
         await mongodb.media_files.create_index([("user_id", 1), ("created_at", -1)])
         
+        # Counter shards collection (sharded members_count / followers_count)
+        await mongodb.counter_shards.create_index([("entity", 1), ("entity_id", 1), ("slot", 1)], unique=True)
+        
+        # Cache invalidations collection (cross-worker bus, short-lived)
+        await mongodb.cache_invalidations.create_index("created_at", expireAfterSeconds=300)
+        
         logger.info("Database indexes created successfully")
         
     except Exception as e:
         logger.warning(f"Error creating indexes: {e}")
-
-
-def get_database() -> AsyncIOMotorDatabase:
-    """Get the database instance"""
-    return mongodb
@@ -1,11 +1,22 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
+import asyncio
 import logging
 
 from config import settings
-from database import connect_to_mongo, close_mongo_connection
-from routers import auth, contacts, chat, campaigns, templates, sheets, channels, communities, profile, settings as settings_router, status
+from database import connect_to_mongo, close_mongo_connection, get_database
+from services.cache_bus import cache_bus
+from services.counter_service import run_reconciler
+from services.trending_service import run_trending_refresher
+from services.channel_reaper import run_channel_reaper
+from services.view_tracker import run_view_flusher
+from services.sheet_sync import run_sheet_syncer
+from services.token_revocation import token_denylist
+from utils.cache import cache_stats
+from utils.executor import executor_stats
+from utils.mongo_pool import pool_telemetry
+from routers import auth, contacts, chat, campaigns, templates, sheets, channels, communities, profile, settings as settings_router, status, segments
 
 
 # Configure logging
@@ -22,9 +33,23 @@ async def lifespan(app: FastAPI):
     # Startup
     logger.info("Starting WhatsHub Enterprise API")
     await connect_to_mongo()
+    await token_denylist.load(get_database())
+    if settings.cache_bus_enabled:
+        await cache_bus.start()
+    background_tasks = [
+        asyncio.create_task(run_reconciler()),
+        asyncio.create_task(run_trending_refresher()),
+        asyncio.create_task(run_channel_reaper()),
+        asyncio.create_task(run_view_flusher()),
+        asyncio.create_task(run_sheet_syncer())
+    ]
     yield
     # Shutdown
     logger.info("Shutting down WhatsHub Enterprise API")
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    await cache_bus.stop()
     await close_mongo_connection()
 
 
@@ -43,6 +68,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Before-Cursor", "X-After-Cursor"],
 )
 
 # Include routers
@@ -57,6 +83,7 @@ app.include_router(communities.router)
 app.include_router(profile.router)
 app.include_router(settings_router.router)
 app.include_router(status.router)
+app.include_router(segments.router)
 
 
 @app.get("/")
@@ -83,6 +110,16 @@ async def health_check():
     }
 
 
+@app.get("/metrics")
+async def metrics():
+    """In-process cache and pool metrics"""
+    return {
+        "caches": cache_stats(),
+        "executors": executor_stats(),
+        "mongodb": pool_telemetry.stats()
+    }
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
@@ -16,11 +16,12 @@ class CampaignBase(BaseModel):
     """Base campaign model"""
     name: str
     template_id: Optional[str] = None
+    segment_id: Optional[str] = None
 
 
 class CampaignCreate(CampaignBase):
-    """Campaign creation model"""
-    sheet_url: str
+    """Campaign creation model (target either a Google Sheet or a segment)"""
+    sheet_url: Optional[str] = None
     sheet_name: Optional[str] = None
     template_parameters: dict = {}
 
@@ -42,6 +43,7 @@ class Campaign(CampaignBase):
 
 class CampaignInDB(Campaign):
     """Campaign model as stored in database"""
+    # Older campaigns only; recipients now live in campaign_recipients
     contact_ids: List[str] = []
     message_ids: List[str] = []
 
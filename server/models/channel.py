@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 
 
@@ -49,6 +49,8 @@ class ChannelMessage(BaseModel):
     channel_id: str
     content: str
     media_url: Optional[str] = None
+    delivered_count: int = 0
+    viewed_count: int = 0
     created_at: datetime
     
     class Config:
@@ -62,6 +64,45 @@ class ChannelMessageCreate(BaseModel):
     media_url: Optional[str] = None
 
 
+class ChannelFeedItem(ChannelMessage):
+    """Channel message in the merged following feed"""
+    channel_name: str = ""
+    channel_avatar_url: Optional[str] = None
+
+
+class ChannelMessageStats(BaseModel):
+    """Delivery and view accounting for a channel message"""
+    message_id: str
+    channel_id: str
+    delivery_mode: Optional[str] = None
+    delivery_status: str
+    delivered_count: int = 0
+    viewed_count: int = 0
+
+
+class ChannelMessageAnalytics(BaseModel):
+    """Approximate unique viewers of a channel message"""
+    message_id: str
+    unique_viewers: int = 0
+    views: int = 0
+
+
+class ChannelDailyReach(BaseModel):
+    """Approximate unique viewers of a channel on one day"""
+    day: str
+    unique_viewers: int = 0
+    views: int = 0
+
+
+class ChannelAnalytics(BaseModel):
+    """Approximate reach of a channel over a period"""
+    channel_id: str
+    days: int
+    unique_viewers: int = 0
+    views: int = 0
+    daily: List[ChannelDailyReach] = []
+
+
 class ChannelWithFollowStatus(Channel):
     """Channel with user's follow status"""
     is_following: bool = False
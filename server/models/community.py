@@ -2,6 +2,9 @@ from pydantic import BaseModel, Field
 from typing import List, Optional
 from datetime import datetime
 
+# Upper bound on user ids accepted by one bulk membership request
+MAX_BULK_MEMBERS = 5000
+
 
 class GroupBase(BaseModel):
     """Base group model"""
@@ -90,6 +93,16 @@ class GroupMessage(BaseModel):
         json_encoders = {datetime: lambda v: v.isoformat()}
 
 
+class GroupUnread(BaseModel):
+    """Unread state of a group for the current member"""
+    group_id: str
+    unread_count: int = 0
+    last_read_at: Optional[datetime] = None
+    
+    class Config:
+        json_encoders = {datetime: lambda v: v.isoformat()}
+
+
 class GroupMessageCreate(BaseModel):
     """Create group message"""
     content: str
@@ -101,3 +114,16 @@ class CommunityWithGroups(Community):
     groups: List[Group] = []
     is_member: bool = False
     is_admin: bool = False
+
+
+class BulkMembershipRequest(BaseModel):
+    """Bulk add/remove members request"""
+    user_ids: List[str] = Field(..., min_length=1, max_length=MAX_BULK_MEMBERS)
+
+
+class BulkMembershipResult(BaseModel):
+    """Outcome of a bulk membership change"""
+    requested: int
+    changed: int  # Members actually added or removed
+    skipped: int  # Already members / not members / not eligible
+    failed: List[str] = []  # Unknown user ids
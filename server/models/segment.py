@@ -0,0 +1,38 @@
+from pydantic import BaseModel, Field
+from typing import Optional
+from datetime import datetime
+
+
+class SegmentBase(BaseModel):
+    """Base segment model"""
+    name: str
+    expression: str  # Boolean tag expression, e.g. "vip AND NOT churned"
+
+
+class SegmentCreate(SegmentBase):
+    """Segment creation model"""
+    pass
+
+
+class SegmentUpdate(BaseModel):
+    """Segment update model"""
+    name: Optional[str] = None
+    expression: Optional[str] = None
+
+
+class Segment(SegmentBase):
+    """Segment response model"""
+    id: str = Field(alias="_id")
+    user_id: str
+    contact_count: int = 0
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        populate_by_name = True
+        json_encoders = {datetime: lambda v: v.isoformat()}
+
+
+class SegmentInDB(Segment):
+    """Segment model as stored in database"""
+    pass
@@ -0,0 +1,46 @@
+from pydantic import BaseModel, Field
+from typing import List, Optional
+from datetime import datetime
+
+
+class SheetSyncResult(BaseModel):
+    """Outcome of one sync run"""
+    rows_scanned: int = 0
+    rows_new: int = 0
+    rows_changed: int = 0
+    rows_unchanged: int = 0
+    contacts_created: int = 0
+    contacts_updated: int = 0
+
+
+class SheetSyncCreate(BaseModel):
+    """Sheet sync creation model"""
+    sheet_url: str
+    sheet_name: Optional[str] = None
+    tags: List[str] = []
+    interval_minutes: Optional[int] = Field(None, ge=5)  # None = manual only
+
+
+class SheetSync(BaseModel):
+    """Sheet sync response model"""
+    id: str = Field(alias="_id")
+    user_id: str
+    sheet_url: str
+    sheet_name: Optional[str] = None
+    tags: List[str] = []
+    interval_minutes: Optional[int] = None
+    synced_rows: int = 0  # Row watermark: rows covered by stored hashes
+    last_synced_at: Optional[datetime] = None
+    next_run_at: Optional[datetime] = None
+    last_result: Optional[SheetSyncResult] = None
+    last_error: Optional[str] = None
+    created_at: datetime
+
+    class Config:
+        populate_by_name = True
+        json_encoders = {datetime: lambda v: v.isoformat()}
+
+
+class SheetSyncInDB(SheetSync):
+    """Sheet sync model as stored in database"""
+    pass
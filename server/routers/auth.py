@@ -1,19 +1,32 @@
 from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi.security import HTTPAuthorizationCredentials
 from fastapi.responses import RedirectResponse
 from database import get_database
 from models.user import UserCreate, UserLogin, User, Token
-from utils.security import get_password_hash, verify_password, create_access_token
-from services.auth_service import get_current_user
+from utils.security import hash_password, check_password, create_access_token, decode_access_token
+from utils.executor import ExecutorSaturated
+from services.auth_service import get_current_user, security
+from services.token_revocation import token_denylist
 from datetime import datetime
 from bson import ObjectId
 from config import get_settings
 import httpx
 from urllib.parse import urlencode
+import asyncio
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 settings = get_settings()
 
 
+def password_pool_busy() -> HTTPException:
+    """503 for when the password hashing pool is saturated or too slow"""
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Server is busy. Please try again shortly.",
+        headers={"Retry-After": "1"}
+    )
+
+
 @router.post("/register", response_model=User, status_code=status.HTTP_201_CREATED)
 async def register(user_data: UserCreate):
     """Register a new user"""
@@ -28,8 +41,11 @@ async def register(user_data: UserCreate):
             detail="Email already registered"
         )
     
-    # Hash password
-    hashed_password = get_password_hash(user_data.password)
+    # Hash password off the event loop
+    try:
+        hashed_password = await hash_password(user_data.password)
+    except (ExecutorSaturated, asyncio.TimeoutError):
+        raise password_pool_busy()
     
     # Create user document
     user_doc = {
@@ -52,21 +68,33 @@ async def login(credentials: UserLogin):
     
     db = get_database()
     
-    # Find user
+    # Find user (OAuth-only accounts have no password to log in with)
     user = await db.users.find_one({"email": credentials.email})
-    if not user:
+    if not user or not user.get("hashed_password"):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password"
         )
     
-    # Verify password
-    if not verify_password(credentials.password, user["hashed_password"]):
+    # Verify password off the event loop
+    try:
+        valid, new_hash = await check_password(credentials.password, user["hashed_password"])
+    except (ExecutorSaturated, asyncio.TimeoutError):
+        raise password_pool_busy()
+    
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password"
         )
     
+    # Stored hash used outdated cost parameters; replace it transparently
+    if new_hash:
+        await db.users.update_one(
+            {"_id": user["_id"], "hashed_password": user["hashed_password"]},
+            {"$set": {"hashed_password": new_hash}}
+        )
+    
     # Create access token
     access_token = create_access_token(data={"sub": str(user["_id"])})
     
@@ -79,6 +107,40 @@ async def get_current_user_info(current_user: User = Depends(get_current_user)):
     return current_user
 
 
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    current_user: User = Depends(get_current_user)
+):
+    """Revoke the access token used for this request"""
+    
+    db = get_database()
+    
+    payload = decode_access_token(credentials.credentials)
+    if payload.get("jti"):
+        await token_denylist.revoke_token(db, payload)
+    else:
+        # Legacy token without an id; only revoking all of them is possible
+        await token_denylist.revoke_user_tokens(db, current_user.id)
+
+
+@router.post("/logout-all", status_code=status.HTTP_204_NO_CONTENT)
+async def logout_all(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    current_user: User = Depends(get_current_user)
+):
+    """Revoke every access token issued to the current user so far"""
+    
+    db = get_database()
+    
+    await token_denylist.revoke_user_tokens(db, current_user.id)
+    
+    # Tokens issued within the current second survive the cutoff; not this one
+    payload = decode_access_token(credentials.credentials)
+    if payload.get("jti"):
+        await token_denylist.revoke_token(db, payload)
+
+
 @router.get("/google/login")
 async def google_login():
     """Initiate Google OAuth login"""
@@ -140,7 +202,7 @@ async def google_callback(code: str):
             user_doc = {
                 "email": user_info['email'],
                 "name": user_info.get('name', user_info['email']),
-                "hashed_password": get_password_hash(""),  # No password for OAuth users
+                "hashed_password": None,  # No password for OAuth users
                 "created_at": datetime.utcnow(),
                 "oauth_provider": "google"
             }
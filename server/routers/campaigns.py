@@ -8,7 +8,13 @@ from models.contact import ContactSource
 from models.message import MessageDirection, MessageStatus, MessageType
 from models.user import User
 from services.auth_service import get_current_user
-from services.sheet_service import sheets_service
+from services.sheet_service import get_sheet_source
+from services.sheet_sync import contact_fields
+from services.segment_service import stream_segment_contacts, apply_tag_changes
+from services.template_registry import lookup_template
+from services.campaign_recipients import (
+    RECIPIENT_BATCH_SIZE, record_recipients, iter_recipient_batches, message_status_counts
+)
 from services.simulation_engine import simulate_campaign_delivery
 from datetime import datetime
 from bson import ObjectId
@@ -18,55 +24,37 @@ import asyncio
 router = APIRouter(prefix="/campaigns", tags=["Campaigns"])
 
 
-@router.post("/", response_model=Campaign, status_code=status.HTTP_201_CREATED)
-async def create_campaign(
-    campaign_data: CampaignCreate,
-    current_user: User = Depends(get_current_user)
-):
-    """
-    Create a new campaign by importing contacts from Google Sheets
-    and sending messages to them
-    """
+async def sheet_recipients(db, user_id: str, campaign_data: CampaignCreate):
+    """Yield (contact_id, name) for each sheet row, creating missing contacts"""
     
-    db = get_database()
+    source = get_sheet_source(campaign_data.sheet_url, user_id)
+    found_rows = False
     
-    try:
-        # Fetch contacts from Google Sheet
-        sheet_data = sheets_service.get_sheet_data(
-            campaign_data.sheet_url,
-            campaign_data.sheet_name
-        )
+    # Stream the sheet in row batches so memory stays flat for large sheets
+    async for batch in source.iter_sheet_rows(
+        campaign_data.sheet_url,
+        campaign_data.sheet_name
+    ):
+        found_rows = True
+        rows = [(name, phone) for name, phone in map(contact_fields, batch) if phone]
+        if not rows:
+            continue  # Skip rows without phone number
         
-        if not sheet_data:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="No data found in the Google Sheet"
-            )
+        # Look up the whole batch's existing contacts at once
+        existing_contacts = await db.contacts.find(
+            {"user_id": user_id, "phone": {"$in": [phone for _, phone in rows]}},
+            {"phone": 1}
+        ).to_list(length=None)
+        contact_ids = {contact["phone"]: str(contact["_id"]) for contact in existing_contacts}
         
-        # Create contacts and messages
-        contact_ids = []
-        message_ids = []
+        # Tags of contacts created from this batch, for segment counts
+        new_contacts = []
         
-        for row in sheet_data:
-            # Extract name and phone (handle different column names)
-            name = row.get('Name') or row.get('name') or row.get('Customer Name') or 'Unknown'
-            phone = row.get('Phone') or row.get('phone') or row.get('Mobile') or row.get('Number')
-            
-            if not phone:
-                continue  # Skip rows without phone number
-            
-            # Check if contact already exists
-            existing_contact = await db.contacts.find_one({
-                "user_id": current_user.id,
-                "phone": phone
-            })
-            
-            if existing_contact:
-                contact_id = str(existing_contact["_id"])
-            else:
+        for name, phone in rows:
+            if phone not in contact_ids:
                 # Create new contact
                 contact_doc = {
-                    "user_id": current_user.id,
+                    "user_id": user_id,
                     "name": name,
                     "phone": phone,
                     "tags": ["campaign", campaign_data.name],
@@ -75,76 +63,81 @@ async def create_campaign(
                 }
                 
                 result = await db.contacts.insert_one(contact_doc)
-                contact_id = str(result.inserted_id)
-            
-            contact_ids.append(contact_id)
-            
-            # Get or create chat thread
-            thread = await db.chat_threads.find_one({
-                "user_id": current_user.id,
-                "contact_id": contact_id
-            })
-            
-            if not thread:
-                thread_doc = {
-                    "user_id": current_user.id,
-                    "contact_id": contact_id,
-                    "last_message": None,
-                    "unread_count": 0,
-                    "updated_at": datetime.utcnow()
-                }
-                thread_result = await db.chat_threads.insert_one(thread_doc)
-                thread_id = str(thread_result.inserted_id)
-            else:
-                thread_id = str(thread["_id"])
-            
-            # Prepare message content
-            if campaign_data.template_id:
-                # Get template and fill parameters
-                from models.template import DEMO_TEMPLATES
-                template = next((t for t in DEMO_TEMPLATES if t["_id"] == campaign_data.template_id), None)
-                
-                if template:
-                    content = template["content"]
-                    # Replace parameters
-                    content = content.replace("{{1}}", name)
-                    for i, (key, value) in enumerate(campaign_data.template_parameters.items(), start=2):
-                        content = content.replace(f"{{{{{i}}}}}", str(value))
-                else:
-                    content = f"Hello {name}! This is a message from {campaign_data.name} campaign."
-            else:
-                content = f"Hello {name}! This is a message from {campaign_data.name} campaign."
-            
-            # Create outbound message
-            message_doc = {
-                "thread_id": thread_id,
-                "direction": MessageDirection.OUTBOUND,
-                "content": content,
-                "type": MessageType.TEMPLATE if campaign_data.template_id else MessageType.TEXT,
-                "status": MessageStatus.SENT,
-                "timestamp": datetime.utcnow()
-            }
-            
-            message_result = await db.messages.insert_one(message_doc)
-            message_ids.append(str(message_result.inserted_id))
-            
-            # Update thread
-            await db.chat_threads.update_one(
-                {"_id": ObjectId(thread_id)},
-                {"$set": {"last_message": content, "updated_at": datetime.utcnow()}}
-            )
+                contact_ids[phone] = str(result.inserted_id)
+                new_contacts.append(contact_doc["tags"])
+        
+        # Contacts created from the sheet may fall into existing segments;
+        # counted per batch so a later failure leaves them consistent
+        await apply_tag_changes(db, user_id, [(None, tags) for tags in new_contacts])
+        
+        for name, phone in rows:
+            yield contact_ids[phone], name
+    
+    if not found_rows:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No data found in the sheet"
+        )
+
+
+async def segment_recipients(db, user_id: str, segment_id: str):
+    """Yield (contact_id, name) for each contact in a segment, streamed from a cursor"""
+    
+    segment = await db.segments.find_one({
+        "_id": ObjectId(segment_id),
+        "user_id": user_id
+    })
+    
+    if not segment:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Segment not found"
+        )
+    
+    async for contact in stream_segment_contacts(db, user_id, segment["expression"]):
+        yield str(contact["_id"]), contact.get("name") or 'Unknown'
+
+
+@router.post("/", response_model=Campaign, status_code=status.HTTP_201_CREATED)
+async def create_campaign(
+    campaign_data: CampaignCreate,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Create a new campaign by importing contacts from Google Sheets or an
+    uploaded file (or targeting a saved segment) and sending messages to them
+    """
+    
+    db = get_database()
+    
+    if not campaign_data.sheet_url and not campaign_data.segment_id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Either sheet_url or segment_id is required"
+        )
+    
+    try:
+        # Get template once for all recipients
+        template = None
+        if campaign_data.template_id:
+            template = await lookup_template(db, current_user.id, campaign_data.template_id)
         
-        # Create campaign document
+        if campaign_data.segment_id:
+            recipients = segment_recipients(db, current_user.id, campaign_data.segment_id)
+        else:
+            recipients = sheet_recipients(db, current_user.id, campaign_data)
+        
+        # The campaign is created first; its recipients are written to
+        # campaign_recipients in bounded batches as messages go out
         campaign_doc = {
             "user_id": current_user.id,
             "name": campaign_data.name,
             "template_id": campaign_data.template_id,
+            "segment_id": campaign_data.segment_id,
             "status": CampaignStatus.ACTIVE,
-            "total_contacts": len(contact_ids),
+            "total_contacts": 0,
             "delivered_count": 0,
             "read_count": 0,
-            "contact_ids": contact_ids,
-            "message_ids": message_ids,
             "created_at": datetime.utcnow()
         }
         
@@ -152,10 +145,92 @@ async def create_campaign(
         campaign_id = str(result.inserted_id)
         campaign_doc["_id"] = campaign_id
         
+        pending = []
+        total_contacts = 0
+        
+        async def flush_recipients():
+            nonlocal pending, total_contacts
+            await record_recipients(db, pending)
+            total_contacts += len(pending)
+            pending = []
+            await db.campaigns.update_one(
+                {"_id": result.inserted_id},
+                {"$set": {"total_contacts": total_contacts}}
+            )
+        
+        try:
+            async for contact_id, name in recipients:
+                # Get or create chat thread
+                thread = await db.chat_threads.find_one({
+                    "user_id": current_user.id,
+                    "contact_id": contact_id
+                })
+                
+                if not thread:
+                    thread_doc = {
+                        "user_id": current_user.id,
+                        "contact_id": contact_id,
+                        "last_message": None,
+                        "unread_count": 0,
+                        "updated_at": datetime.utcnow()
+                    }
+                    thread_result = await db.chat_threads.insert_one(thread_doc)
+                    thread_id = str(thread_result.inserted_id)
+                else:
+                    thread_id = str(thread["_id"])
+                
+                # Prepare message content
+                if template:
+                    content = template["content"]
+                    # Replace parameters
+                    content = content.replace("{{1}}", name)
+                    for i, (key, value) in enumerate(campaign_data.template_parameters.items(), start=2):
+                        content = content.replace(f"{{{{{i}}}}}", str(value))
+                else:
+                    content = f"Hello {name}! This is a message from {campaign_data.name} campaign."
+                
+                # Create outbound message
+                message_doc = {
+                    "thread_id": thread_id,
+                    "direction": MessageDirection.OUTBOUND,
+                    "content": content,
+                    "type": MessageType.TEMPLATE if campaign_data.template_id else MessageType.TEXT,
+                    "status": MessageStatus.SENT,
+                    "timestamp": datetime.utcnow()
+                }
+                
+                message_result = await db.messages.insert_one(message_doc)
+                pending.append({
+                    "campaign_id": campaign_id,
+                    "contact_id": contact_id,
+                    "thread_id": thread_id,
+                    "message_id": message_result.inserted_id
+                })
+                
+                # Update thread
+                await db.chat_threads.update_one(
+                    {"_id": ObjectId(thread_id)},
+                    {"$set": {"last_message": content, "updated_at": datetime.utcnow()}}
+                )
+                
+                if len(pending) >= RECIPIENT_BATCH_SIZE:
+                    await flush_recipients()
+        except Exception:
+            # Messages already sent stay on record; a campaign that sent
+            # nothing is removed
+            if total_contacts or pending:
+                await flush_recipients()
+            else:
+                await db.campaigns.delete_one({"_id": result.inserted_id})
+            raise
+        
+        await flush_recipients()
+        campaign_doc["total_contacts"] = total_contacts
+        
         # Trigger simulation in background
         asyncio.create_task(simulate_campaign_delivery(campaign_id))
         
-        return Campaign(**{k: v for k, v in campaign_doc.items() if k not in ["contact_ids", "message_ids"]})
+        return Campaign(**campaign_doc)
         
     except HTTPException:
         raise
@@ -233,36 +308,16 @@ async def get_campaign_stats(
             detail="Campaign not found"
         )
     
-    # Count messages by status
-    message_ids = campaign.get("message_ids", [])
-    
-    sent_count = await db.messages.count_documents({
-        "_id": {"$in": [ObjectId(mid) for mid in message_ids]},
-        "status": MessageStatus.SENT
-    })
-    
-    delivered_count = await db.messages.count_documents({
-        "_id": {"$in": [ObjectId(mid) for mid in message_ids]},
-        "status": {"$in": [MessageStatus.DELIVERED, MessageStatus.READ]}
-    })
-    
-    read_count = await db.messages.count_documents({
-        "_id": {"$in": [ObjectId(mid) for mid in message_ids]},
-        "status": MessageStatus.READ
-    })
-    
-    failed_count = await db.messages.count_documents({
-        "_id": {"$in": [ObjectId(mid) for mid in message_ids]},
-        "status": MessageStatus.FAILED
-    })
+    # Count messages by status, a batch of recipients at a time
+    counts = await message_status_counts(db, campaign)
     
     return CampaignStats(
         campaign_id=campaign_id,
         total_contacts=campaign["total_contacts"],
-        sent_count=len(message_ids),
-        delivered_count=delivered_count,
-        read_count=read_count,
-        failed_count=failed_count
+        sent_count=sum(counts.values()),
+        delivered_count=counts.get(MessageStatus.DELIVERED, 0) + counts.get(MessageStatus.READ, 0),
+        read_count=counts.get(MessageStatus.READ, 0),
+        failed_count=counts.get(MessageStatus.FAILED, 0)
     )
 
 
@@ -286,37 +341,26 @@ async def get_campaign_contacts(
             detail="Campaign not found"
         )
     
-    contact_ids = campaign.get("contact_ids", [])
-    message_ids = campaign.get("message_ids", [])
-    
-    # Get contacts
-    contacts = await db.contacts.find({
-        "_id": {"$in": [ObjectId(cid) for cid in contact_ids]}
-    }).to_list(length=len(contact_ids))
-    
-    # Get messages
-    messages = await db.messages.find({
-        "_id": {"$in": [ObjectId(mid) for mid in message_ids]}
-    }).to_list(length=len(message_ids))
-    
-    # Map messages to contacts
-    message_by_thread = {str(msg["thread_id"]): msg for msg in messages}
-    
     result = []
-    for contact in contacts:
-        # Find thread for this contact
-        thread = await db.chat_threads.find_one({
-            "user_id": current_user.id,
-            "contact_id": str(contact["_id"])
-        })
+    async for batch in iter_recipient_batches(db, campaign):
+        contacts = await db.contacts.find(
+            {"_id": {"$in": [ObjectId(r["contact_id"]) for r in batch]}},
+            {"name": 1, "phone": 1}
+        ).to_list(length=len(batch))
+        messages = await db.messages.find(
+            {"_id": {"$in": [r["message_id"] for r in batch]}},
+            {"status": 1, "timestamp": 1}
+        ).to_list(length=len(batch))
+        
+        contact_by_id = {str(contact["_id"]): contact for contact in contacts}
+        message_by_id = {message["_id"]: message for message in messages}
         
-        if thread:
-            thread_id = str(thread["_id"])
-            message = message_by_thread.get(thread_id)
-            
-            if message:
+        for recipient in batch:
+            contact = contact_by_id.get(recipient["contact_id"])
+            message = message_by_id.get(recipient["message_id"])
+            if contact and message:
                 result.append(CampaignContact(
-                    contact_id=str(contact["_id"]),
+                    contact_id=recipient["contact_id"],
                     name=contact["name"],
                     phone=contact["phone"],
                     message_status=message["status"],
@@ -1,17 +1,31 @@
-from fastapi import APIRouter, HTTPException, status, Depends, Query
+from fastapi import APIRouter, HTTPException, status, Depends, Query, Response
 from database import get_database
 from models.channel import (
     Channel, ChannelCreate, ChannelMessage, ChannelMessageCreate,
-    ChannelWithFollowStatus, ChannelFollower
+    ChannelWithFollowStatus, ChannelFollower, ChannelMessageStats,
+    ChannelFeedItem, ChannelMessageAnalytics, ChannelAnalytics, ChannelDailyReach
 )
 from models.user import User
 from services.auth_service import get_current_user
-from datetime import datetime
+from services import counter_service
+from services.trending_service import trending_channels
+from services.channel_reaper import LIVE_CHANNEL
+from services.view_tracker import view_tracker
+from utils import hyperloglog
+from services.broadcast_service import broadcast_channel_message, in_audience, record_view, DeliveryStatus
+from utils.pagination import decode_cursor, keyset_filter, set_cursor_headers
+from datetime import datetime, timedelta
 from bson import ObjectId
-from typing import List
+from typing import List, Optional
+import asyncio
+import re
 
 router = APIRouter(prefix="/channels", tags=["Channels"])
 
+# Followed channels per feed query; the planner only merges a bounded
+# number of index ranges before falling back to a blocking sort
+FEED_CHANNEL_BATCH = 100
+
 
 @router.post("/", response_model=Channel, status_code=status.HTTP_201_CREATED)
 async def create_channel(
@@ -25,7 +39,8 @@ async def create_channel(
     # Check if user already has a channel with this name
     existing = await db.channels.find_one({
         "creator_id": current_user.id,
-        "name": channel_data.name
+        "name": channel_data.name,
+        **LIVE_CHANNEL
     })
     
     if existing:
@@ -39,6 +54,7 @@ async def create_channel(
         "name": channel_data.name,
         "description": channel_data.description,
         "avatar_url": channel_data.avatar_url,
+        "name_lower": channel_data.name.lower(),
         "creator_id": current_user.id,
         "followers_count": 0,
         "verified": False,
@@ -57,30 +73,45 @@ async def get_channels(
     search: str = Query(None),
     limit: int = Query(50, le=100)
 ):
-    """Get all channels (for discovery)"""
+    """
+    Get channels for discovery
     
-    db = get_database()
+    Searches are case-insensitive name prefixes served by the name_lower
+    index; the unfiltered page comes from the in-memory trending snapshot.
+    """
     
-    # Build query
-    query = {}
-    if search:
-        query["name"] = {"$regex": search, "$options": "i"}
-    
-    cursor = db.channels.find(query).sort("followers_count", -1).limit(limit)
-    channels = await cursor.to_list(length=limit)
+    db = get_database()
     
-    # Get user's followed channels
-    followed_channel_ids = set()
-    followers = await db.channel_followers.find({"user_id": current_user.id}).to_list(length=None)
+    channels = None
+    if not search:
+        channels = trending_channels.page(limit)
+    
+    if channels is None:
+        # Build query
+        query = dict(LIVE_CHANNEL)
+        if search:
+            query["name_lower"] = {"$regex": f"^{re.escape(search.lower())}"}
+        
+        cursor = db.channels.find(query).sort("followers_count", -1).limit(limit)
+        channels = await cursor.to_list(length=limit)
+        
+        for channel in channels:
+            channel["_id"] = str(channel["_id"])
+        await counter_service.apply_counts(db, "channels", channels)
+    
+    # Check follow status only for the channels on this page
+    followers = await db.channel_followers.find({
+        "user_id": current_user.id,
+        "channel_id": {"$in": [channel["_id"] for channel in channels]}
+    }, {"channel_id": 1}).to_list(length=len(channels))
     followed_channel_ids = {f["channel_id"] for f in followers}
     
     # Format response
     result = []
     for channel in channels:
-        channel["_id"] = str(channel["_id"])
         channel_with_status = ChannelWithFollowStatus(
             **channel,
-            is_following=str(channel["_id"]) in followed_channel_ids,
+            is_following=channel["_id"] in followed_channel_ids,
             is_creator=channel["creator_id"] == current_user.id
         )
         result.append(channel_with_status)
@@ -104,11 +135,14 @@ async def get_following_channels(
         return []
     
     # Get channel details
-    channels = await db.channels.find({"_id": {"$in": channel_ids}}).to_list(length=len(channel_ids))
+    channels = await db.channels.find({"_id": {"$in": channel_ids}, **LIVE_CHANNEL}).to_list(length=len(channel_ids))
     
-    result = []
     for channel in channels:
         channel["_id"] = str(channel["_id"])
+    await counter_service.apply_counts(db, "channels", channels)
+    
+    result = []
+    for channel in channels:
         channel_with_status = ChannelWithFollowStatus(
             **channel,
             is_following=True,
@@ -119,6 +153,108 @@ async def get_following_channels(
     return result
 
 
+async def _feed_batch(db, channel_ids: List[str], ties: Optional[dict], bound: dict, direction: int, limit: int) -> List[dict]:
+    """One page of posts from a batch of channels, in feed order"""
+    sort = [("created_at", direction), ("_id", direction)]
+    messages = []
+    
+    # Posts sharing the cursor's timestamp are read with an equality match
+    # so neither query needs an $or the planner can't merge
+    if ties is not None:
+        messages = await db.channel_messages.find(
+            {"channel_id": {"$in": channel_ids}, **ties}
+        ).sort(sort).limit(limit).to_list(length=limit)
+    
+    if len(messages) < limit:
+        remaining = limit - len(messages)
+        messages += await db.channel_messages.find(
+            {"channel_id": {"$in": channel_ids}, **bound}
+        ).sort(sort).limit(remaining).to_list(length=remaining)
+    
+    return messages
+
+
+@router.get("/feed", response_model=List[ChannelFeedItem])
+async def get_following_feed(
+    response: Response,
+    current_user: User = Depends(get_current_user),
+    limit: int = Query(50, le=100),
+    before: Optional[str] = Query(None, description="Cursor: return posts older than this"),
+    after: Optional[str] = Query(None, description="Cursor: return posts newer than this")
+):
+    """
+    Get one timeline of the newest posts across all followed channels
+    
+    Followed channels are queried in batches of ``FEED_CHANNEL_BATCH``; each
+    batch's $in over the (channel_id, created_at, _id) index is merged by
+    MongoDB (SORT_MERGE) and the batches are merged here, so a page reads
+    at most ``limit`` posts per batch. Deleted channels are dropped before
+    querying so pages are never short.
+    Returned newest first; use X-Before-Cursor to load older posts.
+    """
+    
+    db = get_database()
+    
+    followers = await db.channel_followers.find(
+        {"user_id": current_user.id},
+        {"channel_id": 1}
+    ).to_list(length=None)
+    
+    if not followers:
+        return []
+    
+    channels = await db.channels.find(
+        {"_id": {"$in": [ObjectId(f["channel_id"]) for f in followers]}, **LIVE_CHANNEL},
+        {"name": 1, "avatar_url": 1}
+    ).to_list(length=None)
+    channel_by_id = {str(c["_id"]): c for c in channels}
+    channel_ids = list(channel_by_id)
+    
+    if not channel_ids:
+        return []
+    
+    cursor = before or after
+    direction = 1 if after else -1
+    ties = None
+    bound = {}
+    if cursor:
+        created_at, doc_id = decode_cursor(cursor)
+        ties = {"created_at": created_at, "_id": {"$gt" if after else "$lt": doc_id}}
+        bound = {"created_at": {"$gt" if after else "$lt": created_at}}
+    
+    batches = await asyncio.gather(*[
+        _feed_batch(db, channel_ids[i:i + FEED_CHANNEL_BATCH], ties, bound, direction, limit)
+        for i in range(0, len(channel_ids), FEED_CHANNEL_BATCH)
+    ])
+    
+    messages = sorted(
+        (message for batch in batches for message in batch),
+        key=lambda m: (m["created_at"], m["_id"]),
+        reverse=direction == -1
+    )[:limit]
+    
+    if direction == 1:
+        messages.reverse()
+    
+    if not messages:
+        return []
+    
+    # Cursor headers are computed from oldest-first order
+    set_cursor_headers(response, list(reversed(messages)))
+    
+    result = []
+    for message in messages:
+        message["_id"] = str(message["_id"])
+        channel = channel_by_id[message["channel_id"]]
+        result.append(ChannelFeedItem(
+            **message,
+            channel_name=channel.get("name", ""),
+            channel_avatar_url=channel.get("avatar_url")
+        ))
+    
+    return result
+
+
 @router.get("/{channel_id}", response_model=ChannelWithFollowStatus)
 async def get_channel(
     channel_id: str,
@@ -128,7 +264,7 @@ async def get_channel(
     
     db = get_database()
     
-    channel = await db.channels.find_one({"_id": ObjectId(channel_id)})
+    channel = await db.channels.find_one({"_id": ObjectId(channel_id), **LIVE_CHANNEL})
     
     if not channel:
         raise HTTPException(
@@ -143,6 +279,8 @@ async def get_channel(
     })
     
     channel["_id"] = str(channel["_id"])
+    await counter_service.apply_counts(db, "channels", [channel])
+    
     return ChannelWithFollowStatus(
         **channel,
         is_following=follower is not None,
@@ -160,7 +298,7 @@ async def follow_channel(
     db = get_database()
     
     # Verify channel exists
-    channel = await db.channels.find_one({"_id": ObjectId(channel_id)})
+    channel = await db.channels.find_one({"_id": ObjectId(channel_id), **LIVE_CHANNEL})
     if not channel:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -185,11 +323,8 @@ async def follow_channel(
     
     await db.channel_followers.insert_one(follower_doc)
     
-    # Increment followers count
-    await db.channels.update_one(
-        {"_id": ObjectId(channel_id)},
-        {"$inc": {"followers_count": 1}}
-    )
+    # Increment followers count (sharded)
+    await counter_service.increment(db, "channels", channel_id, 1)
     
     return {"message": "Successfully followed channel"}
 
@@ -214,11 +349,8 @@ async def unfollow_channel(
             detail="You are not following this channel"
         )
     
-    # Decrement followers count
-    await db.channels.update_one(
-        {"_id": ObjectId(channel_id)},
-        {"$inc": {"followers_count": -1}}
-    )
+    # Decrement followers count (sharded)
+    await counter_service.increment(db, "channels", channel_id, -1)
 
 
 @router.post("/{channel_id}/messages", response_model=ChannelMessage, status_code=status.HTTP_201_CREATED)
@@ -232,7 +364,7 @@ async def post_channel_message(
     db = get_database()
     
     # Verify channel exists and user is creator
-    channel = await db.channels.find_one({"_id": ObjectId(channel_id)})
+    channel = await db.channels.find_one({"_id": ObjectId(channel_id), **LIVE_CHANNEL})
     
     if not channel:
         raise HTTPException(
@@ -251,45 +383,214 @@ async def post_channel_message(
         "channel_id": channel_id,
         "content": message_data.content,
         "media_url": message_data.media_url,
+        "delivered_count": 0,
+        "viewed_count": 0,
+        "delivery_status": DeliveryStatus.PENDING,
         "created_at": datetime.utcnow()
     }
     
     result = await db.channel_messages.insert_one(message_doc)
     message_doc["_id"] = str(result.inserted_id)
     
+    # Deliver to followers in background
+    asyncio.create_task(broadcast_channel_message(db, channel_id, message_doc["_id"]))
+    
     return ChannelMessage(**message_doc)
 
 
 @router.get("/{channel_id}/messages", response_model=List[ChannelMessage])
 async def get_channel_messages(
     channel_id: str,
+    response: Response,
     current_user: User = Depends(get_current_user),
-    limit: int = Query(100, le=500)
+    limit: int = Query(100, le=500),
+    before: Optional[str] = Query(None, description="Cursor: return messages older than this"),
+    after: Optional[str] = Query(None, description="Cursor: return messages newer than this"),
+    since: Optional[datetime] = Query(None, description="Return only messages created after this time")
 ):
-    """Get messages from a channel"""
+    """
+    Get messages from a channel (oldest first)
+    
+    Without cursors this returns the latest page. Page boundaries are sent
+    as X-Before-Cursor / X-After-Cursor headers for paging back through
+    history or polling for new messages only.
+    """
     
     db = get_database()
     
     # Verify channel exists
-    channel = await db.channels.find_one({"_id": ObjectId(channel_id)})
+    channel = await db.channels.find_one({"_id": ObjectId(channel_id), **LIVE_CHANNEL})
     if not channel:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Channel not found"
         )
     
-    # Get messages
-    cursor = db.channel_messages.find({
-        "channel_id": channel_id
-    }).sort("created_at", -1).limit(limit)
+    # Get messages; deltas read forward, history reads back from the newest
+    query = {"channel_id": channel_id, **keyset_filter(before, after, since)}
+    direction = 1 if (after or since) else -1
+    
+    cursor = db.channel_messages.find(query).sort([
+        ("created_at", direction), ("_id", direction)
+    ]).limit(limit)
     
     messages = await cursor.to_list(length=limit)
+    if direction == -1:
+        messages.reverse()
+    
+    set_cursor_headers(response, messages)
     
     # Format response
     for message in messages:
         message["_id"] = str(message["_id"])
     
-    return [ChannelMessage(**msg) for msg in reversed(messages)]
+    return [ChannelMessage(**msg) for msg in messages]
+
+
+async def get_owned_channel(db, channel_id: str, user_id: str, detail: str) -> dict:
+    """Fetch a live channel created by the user, or raise 404/403"""
+    channel = await db.channels.find_one({"_id": ObjectId(channel_id), **LIVE_CHANNEL}, {"creator_id": 1})
+    if not channel:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Channel not found"
+        )
+    
+    if channel["creator_id"] != user_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=detail
+        )
+    
+    return channel
+
+
+async def get_message_or_404(db, channel_id: str, message_id: str) -> dict:
+    """Fetch a message belonging to a channel or raise 404"""
+    message = await db.channel_messages.find_one({
+        "_id": ObjectId(message_id),
+        "channel_id": channel_id
+    })
+    
+    if not message:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Message not found"
+        )
+    
+    return message
+
+
+@router.post("/{channel_id}/messages/{message_id}/view", status_code=status.HTTP_200_OK)
+async def view_channel_message(
+    channel_id: str,
+    message_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    """Mark a channel message as viewed by the current user"""
+    
+    db = get_database()
+    
+    message = await get_message_or_404(db, channel_id, message_id)
+    
+    if not await in_audience(db, message, current_user.id):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only followers who received this message can view it"
+        )
+    
+    first_view = await record_view(db, message, current_user.id)
+    view_tracker.record(channel_id, message_id, current_user.id)
+    await view_tracker.flush_if_unattended(db)
+    
+    return {"message": "View recorded", "first_view": first_view}
+
+
+@router.get("/{channel_id}/messages/{message_id}/stats", response_model=ChannelMessageStats)
+async def get_channel_message_stats(
+    channel_id: str,
+    message_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    """Get delivery and view counts for a channel message (creator only)"""
+    
+    db = get_database()
+    
+    await get_owned_channel(db, channel_id, current_user.id, "Only the channel creator can view message stats")
+    message = await get_message_or_404(db, channel_id, message_id)
+    
+    return ChannelMessageStats(
+        message_id=message_id,
+        channel_id=channel_id,
+        delivery_mode=message.get("delivery_mode"),
+        delivery_status=message.get("delivery_status", DeliveryStatus.COMPLETED),
+        delivered_count=message.get("delivered_count", 0),
+        viewed_count=message.get("viewed_count", 0)
+    )
+
+
+@router.get("/{channel_id}/messages/{message_id}/analytics", response_model=ChannelMessageAnalytics)
+async def get_channel_message_analytics(
+    channel_id: str,
+    message_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    """Get approximate unique viewers of a channel message (creator only)"""
+    
+    db = get_database()
+    
+    await get_owned_channel(db, channel_id, current_user.id, "Only the channel creator can view analytics")
+    
+    sketch = await db.channel_message_views.find_one({"_id": message_id, "channel_id": channel_id})
+    if not sketch:
+        return ChannelMessageAnalytics(message_id=message_id)
+    
+    return ChannelMessageAnalytics(
+        message_id=message_id,
+        unique_viewers=hyperloglog.estimate(sketch.get("registers", {})),
+        views=sketch.get("views", 0)
+    )
+
+
+@router.get("/{channel_id}/analytics", response_model=ChannelAnalytics)
+async def get_channel_analytics(
+    channel_id: str,
+    current_user: User = Depends(get_current_user),
+    days: int = Query(7, ge=1, le=90)
+):
+    """
+    Get approximate daily and total reach of a channel (creator only)
+    
+    Total reach merges the daily sketches, so a follower who viewed on
+    several days is counted once.
+    """
+    
+    db = get_database()
+    
+    await get_owned_channel(db, channel_id, current_user.id, "Only the channel creator can view analytics")
+    
+    first_day = (datetime.utcnow() - timedelta(days=days - 1)).strftime("%Y-%m-%d")
+    sketches = await db.channel_reach_daily.find({
+        "channel_id": channel_id,
+        "day": {"$gte": first_day}
+    }).sort("day", 1).to_list(length=days)
+    
+    daily = [
+        ChannelDailyReach(
+            day=sketch["day"],
+            unique_viewers=hyperloglog.estimate(sketch.get("registers", {})),
+            views=sketch.get("views", 0)
+        )
+        for sketch in sketches
+    ]
+    
+    return ChannelAnalytics(
+        channel_id=channel_id,
+        days=days,
+        unique_viewers=hyperloglog.estimate(hyperloglog.merge(s.get("registers", {}) for s in sketches)),
+        views=sum(d.views for d in daily),
+        daily=daily
+    )
 
 
 @router.delete("/{channel_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -297,12 +598,17 @@ async def delete_channel(
     channel_id: str,
     current_user: User = Depends(get_current_user)
 ):
-    """Delete a channel (creator only)"""
+    """
+    Delete a channel (creator only)
+    
+    The channel is tombstoned immediately so every read excludes it; its
+    followers and messages are removed in the background by the reaper.
+    """
     
     db = get_database()
     
     # Verify channel exists and user is creator
-    channel = await db.channels.find_one({"_id": ObjectId(channel_id)})
+    channel = await db.channels.find_one({"_id": ObjectId(channel_id), **LIVE_CHANNEL})
     
     if not channel:
         raise HTTPException(
@@ -316,7 +622,36 @@ async def delete_channel(
             detail="Only the channel creator can delete the channel"
         )
     
-    # Delete channel, followers, and messages
-    await db.channels.delete_one({"_id": ObjectId(channel_id)})
-    await db.channel_followers.delete_many({"channel_id": channel_id})
-    await db.channel_messages.delete_many({"channel_id": channel_id})
+    # Tombstone the channel; followers and messages are reaped in batches
+    await db.channels.update_one(
+        {"_id": ObjectId(channel_id)},
+        {"$set": {"deleted_at": datetime.utcnow(), "deletion_progress": {}}}
+    )
+    trending_channels.discard(channel_id)
+
+
+@router.get("/{channel_id}/deletion")
+async def get_channel_deletion_progress(
+    channel_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    """Get background deletion progress for a deleted channel (creator only)"""
+    
+    db = get_database()
+    
+    channel = await db.channels.find_one({
+        "_id": ObjectId(channel_id),
+        "creator_id": current_user.id,
+        "deleted_at": {"$ne": None}
+    })
+    
+    if not channel:
+        # Fully reaped channels no longer exist
+        return {"channel_id": channel_id, "status": "completed"}
+    
+    return {
+        "channel_id": channel_id,
+        "status": "in_progress",
+        "deleted_at": channel["deleted_at"].isoformat(),
+        "removed": channel.get("deletion_progress", {})
+    }
@@ -6,6 +6,7 @@ from models.message import (
 )
 from models.user import User
 from services.auth_service import get_current_user
+from services.template_registry import lookup_template
 from datetime import datetime
 from bson import ObjectId
 from typing import List
@@ -174,9 +175,8 @@ async def send_template_message(
     
     db = get_database()
     
-    # Get template
-    from models.template import DEMO_TEMPLATES
-    template = next((t for t in DEMO_TEMPLATES if t["_id"] == template_data.template_id), None)
+    # Get template (demo or the user's own)
+    template = await lookup_template(db, current_user.id, template_data.template_id)
     
     if not template:
         raise HTTPException(
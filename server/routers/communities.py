@@ -1,19 +1,76 @@
-from fastapi import APIRouter, HTTPException, status, Depends, Query
+from fastapi import APIRouter, HTTPException, status, Depends, Query, Response
 from database import get_database
 from models.community import (
     Community, CommunityCreate, Group, GroupCreate,
     GroupMessage, GroupMessageCreate, CommunityWithGroups,
-    CommunityMember, GroupMember
+    CommunityMember, GroupMember, GroupUnread,
+    BulkMembershipRequest, BulkMembershipResult
 )
 from models.user import User
 from services.auth_service import get_current_user
+from utils.pagination import keyset_filter, set_cursor_headers
+from services.membership_cache import (
+    require_group_member, invalidate_membership, invalidate_group_memberships
+)
+from services import counter_service
+from services.unread_service import fanout_group_message, mark_group_read, get_unread_counts
 from datetime import datetime
 from bson import ObjectId
-from typing import List
+from pymongo.errors import BulkWriteError
+from typing import List, Dict, Optional
+import asyncio
 
 router = APIRouter(prefix="/communities", tags=["Communities"])
 
 
+async def insert_ignoring_duplicates(collection, docs: List[Dict]) -> int:
+    """
+    Insert documents in one unordered batch, skipping unique-index duplicates
+    
+    Returns the number of documents actually inserted.
+    """
+    if not docs:
+        return 0
+    
+    try:
+        result = await collection.insert_many(docs, ordered=False)
+        return len(result.inserted_ids)
+    except BulkWriteError as e:
+        if any(error.get("code") != 11000 for error in e.details.get("writeErrors", [])):
+            raise
+        return e.details.get("nInserted", 0)
+
+
+async def split_unknown_users(db, user_ids: List[str]):
+    """
+    Split user ids into existing users and unknown ids with one ``$in`` query
+    
+    Returns (existing ids in request order, unknown ids).
+    """
+    object_ids = [ObjectId(uid) for uid in user_ids if ObjectId.is_valid(uid)]
+    found = await db.users.find({"_id": {"$in": object_ids}}, {"_id": 1}).to_list(length=None)
+    found_ids = {str(user["_id"]) for user in found}
+    
+    existing = [uid for uid in user_ids if uid in found_ids]
+    unknown = [uid for uid in user_ids if uid not in found_ids]
+    return existing, unknown
+
+
+async def require_admin(collection, key: str, entity_id: str, user_id: str, detail: str):
+    """Raise 403 unless the user is an admin member of the community/group"""
+    admin = await collection.find_one({
+        key: entity_id,
+        "user_id": user_id,
+        "role": "admin"
+    })
+    
+    if not admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=detail
+        )
+
+
 @router.post("/", response_model=Community, status_code=status.HTTP_201_CREATED)
 async def create_community(
     community_data: CommunityCreate,
@@ -78,40 +135,57 @@ async def create_community(
 @router.get("/", response_model=List[CommunityWithGroups])
 async def get_communities(
     current_user: User = Depends(get_current_user),
+    skip: int = Query(0, ge=0),
     limit: int = Query(50, le=100)
 ):
-    """Get all communities with their groups"""
+    """Get a page of the user's communities with their groups"""
     
     db = get_database()
     
-    # Get user's communities
-    memberships = await db.community_members.find({"user_id": current_user.id}).to_list(length=None)
-    community_ids = [ObjectId(m["community_id"]) for m in memberships]
+    # Get one page of the user's memberships, indexed by community id
+    memberships = await db.community_members.find(
+        {"user_id": current_user.id}
+    ).sort("joined_at", -1).skip(skip).limit(limit).to_list(length=limit)
+    membership_by_community = {m["community_id"]: m for m in memberships}
     
-    if not community_ids:
+    if not membership_by_community:
         return []
     
-    # Get community details
-    communities = await db.communities.find({"_id": {"$in": community_ids}}).limit(limit).to_list(length=limit)
+    community_ids = [ObjectId(cid) for cid in membership_by_community]
     
-    result = []
+    # Get community details and all their groups in one query each
+    communities = await db.communities.find({"_id": {"$in": community_ids}}).to_list(length=limit)
+    groups = await db.groups.find(
+        {"community_id": {"$in": list(membership_by_community)}}
+    ).to_list(length=None)
+    
+    for group in groups:
+        group["_id"] = str(group["_id"])
     for community in communities:
         community["_id"] = str(community["_id"])
-        
-        # Get groups in this community
-        groups = await db.groups.find({"community_id": community["_id"]}).to_list(length=None)
-        for group in groups:
-            group["_id"] = str(group["_id"])
-        
-        # Check if user is admin
-        member = next((m for m in memberships if m["community_id"] == community["_id"]), None)
-        is_admin = member and member.get("role") == "admin"
+    
+    # Fold in pending sharded member counts
+    await counter_service.apply_counts(db, "communities", communities)
+    await counter_service.apply_counts(db, "groups", groups)
+    
+    groups_by_community = {}
+    for group in groups:
+        groups_by_community.setdefault(group["community_id"], []).append(Group(**group))
+    
+    community_by_id = {c["_id"]: c for c in communities}
+    
+    # Preserve membership order (most recently joined first)
+    result = []
+    for community_id, member in membership_by_community.items():
+        community = community_by_id.get(community_id)
+        if not community:
+            continue
         
         community_with_groups = CommunityWithGroups(
             **community,
-            groups=[Group(**g) for g in groups],
+            groups=groups_by_community.get(community_id, []),
             is_member=True,
-            is_admin=is_admin
+            is_admin=member.get("role") == "admin"
         )
         result.append(community_with_groups)
     
@@ -147,6 +221,11 @@ async def get_community(
     })
     
     community["_id"] = str(community["_id"])
+    
+    # Fold in pending sharded member counts
+    await counter_service.apply_counts(db, "communities", [community])
+    await counter_service.apply_counts(db, "groups", groups)
+    
     return CommunityWithGroups(
         **community,
         groups=[Group(**g) for g in groups],
@@ -244,11 +323,8 @@ async def join_community(
         "joined_at": datetime.utcnow()
     })
     
-    # Increment members count
-    await db.communities.update_one(
-        {"_id": ObjectId(community_id)},
-        {"$inc": {"members_count": 1}}
-    )
+    # Increment members count (sharded)
+    await counter_service.increment(db, "communities", community_id, 1)
     
     # Also join announcement group
     announcement_group_id = community["announcement_group_id"]
@@ -259,10 +335,8 @@ async def join_community(
         "joined_at": datetime.utcnow()
     })
     
-    await db.groups.update_one(
-        {"_id": ObjectId(announcement_group_id)},
-        {"$inc": {"members_count": 1}}
-    )
+    await counter_service.increment(db, "groups", announcement_group_id, 1)
+    await invalidate_membership(announcement_group_id, current_user.id)
     
     return {"message": "Successfully joined community"}
 
@@ -314,26 +388,149 @@ async def join_group(
         "joined_at": datetime.utcnow()
     })
     
-    # Increment members count
-    await db.groups.update_one(
-        {"_id": ObjectId(group_id)},
-        {"$inc": {"members_count": 1}}
-    )
+    # Increment members count (sharded)
+    await counter_service.increment(db, "groups", group_id, 1)
+    await invalidate_membership(group_id, current_user.id)
     
     return {"message": "Successfully joined group"}
 
 
-@router.post("/groups/{group_id}/messages", response_model=GroupMessage, status_code=status.HTTP_201_CREATED)
-async def send_group_message(
+@router.delete("/groups/{group_id}/leave", status_code=status.HTTP_204_NO_CONTENT)
+async def leave_group(
     group_id: str,
-    message_data: GroupMessageCreate,
     current_user: User = Depends(get_current_user)
 ):
-    """Send a message to a group"""
+    """Leave a group"""
+    
+    db = get_database()
+    
+    result = await db.group_members.delete_one({
+        "group_id": group_id,
+        "user_id": current_user.id
+    })
+    
+    if result.deleted_count == 0:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="You are not a member of this group"
+        )
+    
+    # Decrement members count (sharded)
+    await counter_service.increment(db, "groups", group_id, -1)
+    await invalidate_membership(group_id, current_user.id)
+
+
+@router.post("/{community_id}/members/bulk", response_model=BulkMembershipResult)
+async def bulk_add_community_members(
+    community_id: str,
+    request: BulkMembershipRequest,
+    current_user: User = Depends(get_current_user)
+):
+    """Add many users to a community and its announcement group (admin only)"""
+    
+    db = get_database()
+    
+    community = await db.communities.find_one({"_id": ObjectId(community_id)})
+    if not community:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Community not found"
+        )
+    
+    await require_admin(
+        db.community_members, "community_id", community_id, current_user.id,
+        "Only community admins can add members"
+    )
+    
+    user_ids, unknown = await split_unknown_users(db, list(dict.fromkeys(request.user_ids)))
+    announcement_group_id = community["announcement_group_id"]
+    now = datetime.utcnow()
+    
+    # The unique (community_id, user_id) index skips existing members
+    added = await insert_ignoring_duplicates(db.community_members, [
+        {"community_id": community_id, "user_id": user_id, "role": "member", "joined_at": now}
+        for user_id in user_ids
+    ])
+    added_to_group = await insert_ignoring_duplicates(db.group_members, [
+        {"group_id": announcement_group_id, "user_id": user_id, "role": "member", "joined_at": now}
+        for user_id in user_ids
+    ])
+    
+    # One counter update per entity
+    if added:
+        await counter_service.increment(db, "communities", community_id, added)
+    if added_to_group:
+        await counter_service.increment(db, "groups", announcement_group_id, added_to_group)
+    
+    return BulkMembershipResult(
+        requested=len(request.user_ids),
+        changed=added,
+        skipped=len(request.user_ids) - added - len(unknown),
+        failed=unknown
+    )
+
+
+@router.post("/{community_id}/members/bulk-remove", response_model=BulkMembershipResult)
+async def bulk_remove_community_members(
+    community_id: str,
+    request: BulkMembershipRequest,
+    current_user: User = Depends(get_current_user)
+):
+    """Remove many users from a community and all of its groups (admin only)"""
+    
+    db = get_database()
+    
+    await require_admin(
+        db.community_members, "community_id", community_id, current_user.id,
+        "Only community admins can remove members"
+    )
+    
+    # Admins can't remove themselves this way
+    user_ids = [uid for uid in dict.fromkeys(request.user_ids) if uid != current_user.id]
+    
+    result = await db.community_members.delete_many({
+        "community_id": community_id,
+        "user_id": {"$in": user_ids}
+    })
+    removed = result.deleted_count
+    
+    # Count removals per group first so each group gets a single counter update
+    groups = await db.groups.find({"community_id": community_id}, {"_id": 1}).to_list(length=None)
+    group_ids = [str(g["_id"]) for g in groups]
+    
+    removed_per_group = await db.group_members.aggregate([
+        {"$match": {"group_id": {"$in": group_ids}, "user_id": {"$in": user_ids}}},
+        {"$group": {"_id": "$group_id", "count": {"$sum": 1}}}
+    ]).to_list(length=None)
+    
+    await db.group_members.delete_many({
+        "group_id": {"$in": group_ids},
+        "user_id": {"$in": user_ids}
+    })
+    
+    if removed:
+        await counter_service.increment(db, "communities", community_id, -removed)
+    for entry in removed_per_group:
+        await counter_service.increment(db, "groups", entry["_id"], -entry["count"])
+        await invalidate_group_memberships(entry["_id"])
+    
+    return BulkMembershipResult(
+        requested=len(request.user_ids),
+        changed=removed,
+        skipped=len(request.user_ids) - removed
+    )
+
+
+@router.post("/groups/{group_id}/members/bulk", response_model=BulkMembershipResult)
+async def bulk_add_group_members(
+    group_id: str,
+    request: BulkMembershipRequest,
+    current_user: User = Depends(get_current_user)
+):
+    """Add many users to a group (group admin only)"""
     
     db = get_database()
     
-    # Verify group exists and user is member
     group = await db.groups.find_one({"_id": ObjectId(group_id)})
     if not group:
         raise HTTPException(
@@ -341,17 +538,120 @@ async def send_group_message(
             detail="Group not found"
         )
     
-    member = await db.group_members.find_one({
+    await require_admin(
+        db.group_members, "group_id", group_id, current_user.id,
+        "Only group admins can add members"
+    )
+    
+    user_ids, unknown = await split_unknown_users(db, list(dict.fromkeys(request.user_ids)))
+    
+    # Only members of the parent community may join its groups
+    if group.get("community_id"):
+        eligible = await db.community_members.find(
+            {"community_id": group["community_id"], "user_id": {"$in": user_ids}},
+            {"user_id": 1}
+        ).to_list(length=None)
+        eligible_ids = {m["user_id"] for m in eligible}
+        user_ids = [uid for uid in user_ids if uid in eligible_ids]
+    
+    now = datetime.utcnow()
+    added = await insert_ignoring_duplicates(db.group_members, [
+        {"group_id": group_id, "user_id": user_id, "role": "member", "joined_at": now}
+        for user_id in user_ids
+    ])
+    
+    if added:
+        await counter_service.increment(db, "groups", group_id, added)
+    
+    return BulkMembershipResult(
+        requested=len(request.user_ids),
+        changed=added,
+        skipped=len(request.user_ids) - added - len(unknown),
+        failed=unknown
+    )
+
+
+@router.post("/groups/{group_id}/members/bulk-remove", response_model=BulkMembershipResult)
+async def bulk_remove_group_members(
+    group_id: str,
+    request: BulkMembershipRequest,
+    current_user: User = Depends(get_current_user)
+):
+    """Remove many users from a group (group admin only)"""
+    
+    db = get_database()
+    
+    await require_admin(
+        db.group_members, "group_id", group_id, current_user.id,
+        "Only group admins can remove members"
+    )
+    
+    user_ids = [uid for uid in dict.fromkeys(request.user_ids) if uid != current_user.id]
+    
+    result = await db.group_members.delete_many({
         "group_id": group_id,
-        "user_id": current_user.id
+        "user_id": {"$in": user_ids}
     })
+    removed = result.deleted_count
     
-    if not member:
+    if removed:
+        await counter_service.increment(db, "groups", group_id, -removed)
+        await invalidate_group_memberships(group_id)
+    
+    return BulkMembershipResult(
+        requested=len(request.user_ids),
+        changed=removed,
+        skipped=len(request.user_ids) - removed
+    )
+
+
+@router.get("/groups/unread", response_model=List[GroupUnread])
+async def get_groups_unread(
+    current_user: User = Depends(get_current_user)
+):
+    """Get unread message counts for all of the user's groups"""
+    
+    db = get_database()
+    
+    unread = await get_unread_counts(db, current_user.id)
+    
+    return [GroupUnread(**entry) for entry in unread]
+
+
+@router.post("/groups/{group_id}/read", status_code=status.HTTP_200_OK)
+async def mark_group_messages_read(
+    group_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    """Mark all messages in a group as read"""
+    
+    db = get_database()
+    
+    if not await mark_group_read(db, group_id, current_user.id):
         raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="You must be a member of this group to send messages"
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="You are not a member of this group"
         )
     
+    return {"message": "Group marked as read"}
+
+
+@router.post("/groups/{group_id}/messages", response_model=GroupMessage, status_code=status.HTTP_201_CREATED)
+async def send_group_message(
+    group_id: str,
+    message_data: GroupMessageCreate,
+    current_user: User = Depends(get_current_user)
+):
+    """Send a message to a group"""
+    
+    db = get_database()
+    
+    # Verify group exists and user is member (cached per process)
+    await require_group_member(
+        db, group_id, current_user.id,
+        "You must be a member of this group to send messages"
+    )
+    
     # Create message
     message_doc = {
         "group_id": group_id,
@@ -365,47 +665,54 @@ async def send_group_message(
     result = await db.group_messages.insert_one(message_doc)
     message_doc["_id"] = str(result.inserted_id)
     
+    # Update members' unread counters in background
+    asyncio.create_task(fanout_group_message(db, group_id, current_user.id, message_doc["created_at"]))
+    
     return GroupMessage(**message_doc)
 
 
 @router.get("/groups/{group_id}/messages", response_model=List[GroupMessage])
 async def get_group_messages(
     group_id: str,
+    response: Response,
     current_user: User = Depends(get_current_user),
-    limit: int = Query(100, le=500)
+    limit: int = Query(100, le=500),
+    before: Optional[str] = Query(None, description="Cursor: return messages older than this"),
+    after: Optional[str] = Query(None, description="Cursor: return messages newer than this"),
+    since: Optional[datetime] = Query(None, description="Return only messages created after this time")
 ):
-    """Get messages from a group"""
+    """
+    Get messages from a group (oldest first)
     
-    db = get_database()
+    Without cursors this returns the latest page. Page boundaries are sent
+    as X-Before-Cursor / X-After-Cursor headers for paging back through
+    history or polling for new messages only.
+    """
     
-    # Verify group exists and user is member
-    group = await db.groups.find_one({"_id": ObjectId(group_id)})
-    if not group:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Group not found"
-        )
+    db = get_database()
     
-    member = await db.group_members.find_one({
-        "group_id": group_id,
-        "user_id": current_user.id
-    })
+    # Verify group exists and user is member (cached per process)
+    await require_group_member(
+        db, group_id, current_user.id,
+        "You must be a member of this group to view messages"
+    )
     
-    if not member:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="You must be a member of this group to view messages"
-        )
+    # Get messages; deltas read forward, history reads back from the newest
+    query = {"group_id": group_id, **keyset_filter(before, after, since)}
+    direction = 1 if (after or since) else -1
     
-    # Get messages
-    cursor = db.group_messages.find({
-        "group_id": group_id
-    }).sort("created_at", -1).limit(limit)
+    cursor = db.group_messages.find(query).sort([
+        ("created_at", direction), ("_id", direction)
+    ]).limit(limit)
     
     messages = await cursor.to_list(length=limit)
+    if direction == -1:
+        messages.reverse()
+    
+    set_cursor_headers(response, messages)
     
     # Format response
     for message in messages:
         message["_id"] = str(message["_id"])
     
-    return [GroupMessage(**msg) for msg in reversed(messages)]
+    return [GroupMessage(**msg) for msg in messages]
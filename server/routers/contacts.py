@@ -7,6 +7,8 @@ from models.contact import (
 )
 from models.user import User
 from services.auth_service import get_current_user
+from services.segment_service import apply_tag_change
+from services.status_feed import invalidate_viewers
 from datetime import datetime
 from bson import ObjectId
 from typing import List, Optional
@@ -94,6 +96,9 @@ async def add_contact(
     result = await db.contact_relationships.insert_one(rel_a_to_b)
     await db.contact_relationships.insert_one(rel_b_to_a)
     
+    # Both sides now see each other's statuses
+    await invalidate_viewers([current_user.id, target_user_id])
+    
     # Return the created relationship for current user
     rel_a_to_b["_id"] = str(result.inserted_id)
     return ContactRelationshipInDB(**rel_a_to_b)
@@ -125,6 +130,8 @@ async def block_contact(
         {"$set": {"is_blocked": True, "updated_at": datetime.utcnow()}}
     )
     
+    await invalidate_viewers([current_user.id])
+    
     return {"message": "Contact blocked successfully"}
 
 
@@ -146,6 +153,8 @@ async def unblock_contact(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Contact not found"
         )
+    
+    await invalidate_viewers([current_user.id])
         
     return {"message": "Contact unblocked successfully"}
 
@@ -241,4 +250,8 @@ async def create_contact_legacy(
     
     result = await db.contacts.insert_one(contact_doc)
     contact_doc["_id"] = str(result.inserted_id)
+    
+    # Keep segment sizes current
+    await apply_tag_change(db, current_user.id, None, contact_doc.get("tags", []))
+    
     return Contact(**contact_doc)
@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from database import get_database
 from models.user import User
-from services.auth_service import get_current_user
+from services.auth_service import get_current_user, invalidate_user
 from pydantic import BaseModel, EmailStr
 from typing import Optional
 from bson import ObjectId
@@ -89,6 +89,7 @@ async def update_profile(
         {"_id": ObjectId(current_user.id)},
         {"$set": update_data}
     )
+    await invalidate_user(current_user.id)
     
     # Get updated user
     updated_user = await db.users.find_one({"_id": ObjectId(current_user.id)})
@@ -0,0 +1,209 @@
+from fastapi import APIRouter, HTTPException, status, Depends, Query
+from database import get_database
+from models.segment import Segment, SegmentCreate, SegmentUpdate
+from models.contact import Contact
+from models.user import User
+from services.auth_service import get_current_user
+from services.segment_service import (
+    SegmentExpressionError, parse_expression, count_segment, segment_filter
+)
+from datetime import datetime
+from bson import ObjectId
+from typing import List
+
+router = APIRouter(prefix="/segments", tags=["Segments"])
+
+
+def validate_expression(expression: str):
+    """Reject expressions that cannot be parsed"""
+    try:
+        parse_expression(expression)
+    except SegmentExpressionError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid segment expression: {str(e)}"
+        )
+
+
+async def get_user_segment(db, segment_id: str, user_id: str) -> dict:
+    """Fetch a segment owned by the user or raise 404"""
+    segment = await db.segments.find_one({
+        "_id": ObjectId(segment_id),
+        "user_id": user_id
+    })
+
+    if not segment:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Segment not found"
+        )
+
+    return segment
+
+
+@router.post("/", response_model=Segment, status_code=status.HTTP_201_CREATED)
+async def create_segment(
+    segment_data: SegmentCreate,
+    current_user: User = Depends(get_current_user)
+):
+    """Create a tag-based audience segment"""
+
+    db = get_database()
+
+    validate_expression(segment_data.expression)
+
+    # Seed the count once; it is maintained incrementally afterwards
+    contact_count = await count_segment(db, current_user.id, segment_data.expression)
+
+    segment_doc = {
+        "user_id": current_user.id,
+        "name": segment_data.name,
+        "expression": segment_data.expression,
+        "contact_count": contact_count,
+        "created_at": datetime.utcnow(),
+        "updated_at": datetime.utcnow()
+    }
+
+    result = await db.segments.insert_one(segment_doc)
+    segment_doc["_id"] = str(result.inserted_id)
+
+    return Segment(**segment_doc)
+
+
+@router.get("/", response_model=List[Segment])
+async def get_segments(
+    current_user: User = Depends(get_current_user),
+    limit: int = Query(50, le=100)
+):
+    """Get all segments for the current user with their precomputed sizes"""
+
+    db = get_database()
+
+    cursor = db.segments.find({"user_id": current_user.id}).sort("created_at", -1).limit(limit)
+    segments = await cursor.to_list(length=limit)
+
+    for segment in segments:
+        segment["_id"] = str(segment["_id"])
+
+    return [Segment(**segment) for segment in segments]
+
+
+@router.get("/{segment_id}", response_model=Segment)
+async def get_segment(
+    segment_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    """Get a specific segment"""
+
+    db = get_database()
+
+    segment = await get_user_segment(db, segment_id, current_user.id)
+    segment["_id"] = str(segment["_id"])
+
+    return Segment(**segment)
+
+
+@router.put("/{segment_id}", response_model=Segment)
+async def update_segment(
+    segment_id: str,
+    segment_data: SegmentUpdate,
+    current_user: User = Depends(get_current_user)
+):
+    """Rename a segment or change its expression"""
+
+    db = get_database()
+
+    await get_user_segment(db, segment_id, current_user.id)
+
+    update_data = {k: v for k, v in segment_data.model_dump(exclude_unset=True).items() if v is not None}
+
+    if not update_data:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No fields to update"
+        )
+
+    if "expression" in update_data:
+        validate_expression(update_data["expression"])
+        update_data["contact_count"] = await count_segment(db, current_user.id, update_data["expression"])
+
+    update_data["updated_at"] = datetime.utcnow()
+
+    await db.segments.update_one(
+        {"_id": ObjectId(segment_id)},
+        {"$set": update_data}
+    )
+
+    updated = await db.segments.find_one({"_id": ObjectId(segment_id)})
+    updated["_id"] = str(updated["_id"])
+
+    return Segment(**updated)
+
+
+@router.post("/{segment_id}/recount", response_model=Segment)
+async def recount_segment(
+    segment_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    """Recompute a segment's size from scratch to correct any drift"""
+
+    db = get_database()
+
+    segment = await get_user_segment(db, segment_id, current_user.id)
+    contact_count = await count_segment(db, current_user.id, segment["expression"])
+
+    await db.segments.update_one(
+        {"_id": segment["_id"]},
+        {"$set": {"contact_count": contact_count, "updated_at": datetime.utcnow()}}
+    )
+
+    segment["_id"] = str(segment["_id"])
+    segment["contact_count"] = contact_count
+
+    return Segment(**segment)
+
+
+@router.get("/{segment_id}/contacts", response_model=List[Contact])
+async def get_segment_contacts(
+    segment_id: str,
+    current_user: User = Depends(get_current_user),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, le=500)
+):
+    """List contacts that currently match a segment"""
+
+    db = get_database()
+
+    segment = await get_user_segment(db, segment_id, current_user.id)
+
+    cursor = db.contacts.find(
+        segment_filter(current_user.id, segment["expression"])
+    ).sort("_id", 1).skip(skip).limit(limit)
+
+    contacts = await cursor.to_list(length=limit)
+
+    for contact in contacts:
+        contact["_id"] = str(contact["_id"])
+
+    return [Contact(**contact) for contact in contacts]
+
+
+@router.delete("/{segment_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_segment(
+    segment_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    """Delete a segment"""
+
+    db = get_database()
+
+    result = await db.segments.delete_one({
+        "_id": ObjectId(segment_id),
+        "user_id": current_user.id
+    })
+
+    if result.deleted_count == 0:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Segment not found"
+        )
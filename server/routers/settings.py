@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from database import get_database
 from models.user import User
-from services.auth_service import get_current_user
+from services.auth_service import get_current_user, invalidate_user
 from pydantic import BaseModel
 from typing import Optional, Dict, Any
 from bson import ObjectId
@@ -99,5 +99,6 @@ async def update_settings(
         {"_id": ObjectId(current_user.id)},
         {"$set": {"settings": updated_settings}}
     )
+    await invalidate_user(current_user.id)
     
     return SettingsResponse(**updated_settings)
@@ -1,12 +1,24 @@
-from fastapi import APIRouter, HTTPException, Depends
-from services.sheet_service import sheets_service
+from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, status
+from database import get_database
+from services.sheet_service import get_sheet_source
+from services.local_sheet_service import SUPPORTED_EXTENSIONS, user_sheet_root
+from services.sheet_sync import sync_sheet
+from models.sheet_sync import SheetSync, SheetSyncCreate, SheetSyncResult
 from models.user import User
 from services.auth_service import get_current_user
+from config import settings
+from datetime import datetime, timedelta
+from bson import ObjectId
 from typing import List
 from pydantic import BaseModel
+import os
+import uuid
 
 router = APIRouter(prefix="/sheets", tags=["Google Sheets"])
 
+# Bytes read per chunk while saving an upload
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
 
 class SheetInfo(BaseModel):
     """Sheet information model"""
@@ -22,7 +34,7 @@ async def validate_sheet(
     """Validate a Google Sheet URL and get sheet names"""
     
     try:
-        sheet_names = sheets_service.get_sheet_names(sheet_url)
+        sheet_names = await get_sheet_source(sheet_url, current_user.id).get_sheet_names(sheet_url)
         
         return {
             "valid": True,
@@ -47,14 +59,13 @@ async def preview_sheet_data(
     """Preview data from a Google Sheet"""
     
     try:
-        data = sheets_service.get_sheet_data(sheet_url, sheet_name)
-        
-        # Return first 10 rows for preview
-        preview_data = data[:10] if len(data) > 10 else data
+        # Only the first 10 rows are downloaded
+        source = get_sheet_source(sheet_url, current_user.id)
+        preview_data, total_rows = await source.preview_sheet(sheet_url, sheet_name, rows=10)
         
         return {
             "success": True,
-            "total_rows": len(data),
+            "total_rows": total_rows,
             "preview_rows": len(preview_data),
             "data": preview_data,
             "columns": list(preview_data[0].keys()) if preview_data else []
@@ -65,3 +76,179 @@ async def preview_sheet_data(
             status_code=400,
             detail=str(e)
         )
+
+
+@router.post("/upload", response_model=SheetInfo, status_code=status.HTTP_201_CREATED)
+async def upload_sheet(
+    file: UploadFile = File(...),
+    current_user: User = Depends(get_current_user)
+):
+    """Upload a CSV, XLSX or Parquet file to import contacts from"""
+    
+    extension = os.path.splitext(file.filename or "")[1].lower()
+    if extension not in SUPPORTED_EXTENSIONS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Unsupported file type. Use CSV, XLSX or Parquet."
+        )
+    
+    directory = user_sheet_root(current_user.id)
+    os.makedirs(directory, exist_ok=True)
+    file_name = f"{uuid.uuid4().hex}{extension}"
+    path = os.path.join(directory, file_name)
+    
+    # Copy in chunks so large uploads never sit in memory
+    size = 0
+    with open(path, "wb") as target:
+        while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+            size += len(chunk)
+            if size > settings.sheet_upload_max_bytes:
+                target.close()
+                os.remove(path)
+                raise HTTPException(
+                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    detail="File is too large"
+                )
+            target.write(chunk)
+    
+    sheet_url = f"file:///{file_name}"
+    
+    try:
+        sheet_names = await get_sheet_source(sheet_url, current_user.id).get_sheet_names(sheet_url)
+    except Exception as e:
+        os.remove(path)
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    return SheetInfo(sheet_url=sheet_url, sheet_names=sheet_names)
+
+
+async def run_sync_now(db, sync_id: str, user_id: str) -> SheetSyncResult:
+    """Lease a sync and run it; 409 if a run is already in progress"""
+    now = datetime.utcnow()
+    sync = await db.sheet_syncs.find_one_and_update(
+        {
+            "_id": ObjectId(sync_id),
+            "user_id": user_id,
+            "$or": [
+                {"sync_lease_until": None},
+                {"sync_lease_until": {"$lt": now}}
+            ]
+        },
+        {"$set": {"sync_lease_until": now + timedelta(seconds=settings.sheet_sync_lease_seconds)}}
+    )
+    
+    if not sync:
+        exists = await db.sheet_syncs.find_one({"_id": ObjectId(sync_id), "user_id": user_id}, {"_id": 1})
+        if not exists:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Sheet sync not found"
+            )
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Sheet sync is already running"
+        )
+    
+    try:
+        result = await sync_sheet(db, sync)
+    except Exception as e:
+        await db.sheet_syncs.update_one(
+            {"_id": sync["_id"]},
+            {"$set": {"last_error": str(e), "sync_lease_until": None}}
+        )
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    return SheetSyncResult(**result)
+
+
+@router.post("/syncs", response_model=SheetSync, status_code=status.HTTP_201_CREATED)
+async def create_sheet_sync(
+    sync_data: SheetSyncCreate,
+    current_user: User = Depends(get_current_user)
+):
+    """Start syncing contacts from a sheet and run the first (full) import"""
+    
+    db = get_database()
+    
+    sync_doc = {
+        "user_id": current_user.id,
+        "sheet_url": sync_data.sheet_url,
+        "sheet_name": sync_data.sheet_name,
+        "tags": sync_data.tags,
+        "interval_minutes": sync_data.interval_minutes,
+        "synced_rows": 0,
+        "created_at": datetime.utcnow()
+    }
+    if sync_data.interval_minutes:
+        sync_doc["next_run_at"] = datetime.utcnow() + timedelta(minutes=sync_data.interval_minutes)
+    
+    result = await db.sheet_syncs.insert_one(sync_doc)
+    sync_id = str(result.inserted_id)
+    
+    try:
+        await run_sync_now(db, sync_id, current_user.id)
+    except HTTPException:
+        # A sheet that can't be read is not kept as a sync
+        await db.sheet_syncs.delete_one({"_id": result.inserted_id})
+        await db.sheet_sync_rows.delete_many({"sync_id": sync_id})
+        raise
+    
+    synced = await db.sheet_syncs.find_one({"_id": result.inserted_id})
+    synced["_id"] = sync_id
+    
+    return SheetSync(**synced)
+
+
+@router.get("/syncs", response_model=List[SheetSync])
+async def get_sheet_syncs(current_user: User = Depends(get_current_user)):
+    """Get all sheet syncs for the current user"""
+    
+    db = get_database()
+    
+    syncs = await db.sheet_syncs.find({"user_id": current_user.id}).sort("created_at", -1).to_list(length=100)
+    
+    for sync in syncs:
+        sync["_id"] = str(sync["_id"])
+    
+    return [SheetSync(**sync) for sync in syncs]
+
+
+@router.post("/syncs/{sync_id}/run", response_model=SheetSyncResult)
+async def run_sheet_sync(
+    sync_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    """Import only the rows that are new or changed since the last sync"""
+    
+    db = get_database()
+    
+    return await run_sync_now(db, sync_id, current_user.id)
+
+
+@router.delete("/syncs/{sync_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_sheet_sync(
+    sync_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    """Stop syncing a sheet; contacts already imported are kept"""
+    
+    db = get_database()
+    
+    result = await db.sheet_syncs.delete_one({
+        "_id": ObjectId(sync_id),
+        "user_id": current_user.id
+    })
+    
+    if result.deleted_count == 0:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Sheet sync not found"
+        )
+    
+    await db.sheet_sync_rows.delete_many({"sync_id": sync_id})
@@ -2,10 +2,18 @@ from fastapi import APIRouter, Depends, HTTPException, status, Query
 from database import get_database
 from models.user import User
 from services.auth_service import get_current_user
-from pydantic import BaseModel
+from services.status_feed import feed_authors, get_feed, invalidate_author, invalidate_viewers
+from pydantic import BaseModel, Field
 from typing import Optional, List
 from datetime import datetime, timedelta
 from bson import ObjectId
+from pymongo import ReturnDocument, UpdateOne
+
+# Viewer ids live in status_views, never on the status document
+STATUS_PROJECTION = {"viewers": 0}
+
+# Statuses expire this long after creation
+STATUS_LIFETIME = timedelta(hours=24)
 
 router = APIRouter(prefix="/status", tags=["Status"])
 
@@ -32,6 +40,38 @@ class StatusUpdate(BaseModel):
     views_count: int = 0
 
 
+class StatusAuthorGroup(BaseModel):
+    """One contact's live statuses in the feed"""
+    user_id: str
+    contact_name: str
+    contact_phone: str
+    has_unseen: bool
+    latest_at: str
+    statuses: List[StatusUpdate]
+
+
+class MarkViewedRequest(BaseModel):
+    """Batch view marking request"""
+    status_ids: List[str] = Field(..., min_length=1, max_length=100)
+
+
+def format_status(status_doc: dict, viewed: bool) -> StatusUpdate:
+    """Build the response model from a status document"""
+    return StatusUpdate(
+        id=str(status_doc["_id"]),
+        user_id=status_doc.get("user_id", ""),
+        contact_name=status_doc.get("contact_name", ""),
+        contact_phone=status_doc.get("contact_phone", ""),
+        content=status_doc.get("content", ""),
+        media_url=status_doc.get("media_url"),
+        media_type=status_doc.get("media_type", "text"),
+        created_at=status_doc.get("created_at", datetime.utcnow()).isoformat(),
+        expires_at=status_doc.get("expires_at", datetime.utcnow()).isoformat(),
+        viewed=viewed,
+        views_count=status_doc.get("views_count", 0)
+    )
+
+
 @router.post("/", status_code=status.HTTP_201_CREATED)
 async def create_status(
     status_data: StatusCreate,
@@ -53,15 +93,16 @@ async def create_status(
         "media_url": status_data.media_url,
         "media_type": status_data.media_type,
         "created_at": datetime.utcnow(),
-        "expires_at": datetime.utcnow() + timedelta(hours=24),
+        "expires_at": datetime.utcnow() + STATUS_LIFETIME,
         "viewed": False,
-        "views_count": 0,
-        "viewers": []  # List of user IDs who viewed
+        "views_count": 0
     }
     
     result = await db.status_updates.insert_one(status_doc)
     status_doc["_id"] = str(result.inserted_id)
     
+    await invalidate_author(db, current_user.id)
+    
     return {
         "id": str(result.inserted_id),
         "message": "Status created successfully",
@@ -74,35 +115,99 @@ async def get_statuses(
     current_user: User = Depends(get_current_user),
     limit: int = Query(50, le=100)
 ):
-    """Get all active status updates (not expired)"""
+    """Get active status updates from the current user's contacts"""
     
     db = get_database()
     
-    # Get all non-expired statuses
     now = datetime.utcnow()
+    authors = await feed_authors(db, current_user.id)
     
     statuses = await db.status_updates.find({
+        "user_id": {"$in": authors},
         "expires_at": {"$gt": now}
-    }).sort("created_at", -1).limit(limit).to_list(length=limit)
-    
-    # Format response
-    result = []
-    for status in statuses:
-        result.append(StatusUpdate(
-            id=str(status["_id"]),
-            user_id=status.get("user_id", ""),
-            contact_name=status.get("contact_name", ""),
-            contact_phone=status.get("contact_phone", ""),
-            content=status.get("content", ""),
-            media_url=status.get("media_url"),
-            media_type=status.get("media_type", "text"),
-            created_at=status.get("created_at", datetime.utcnow()).isoformat(),
-            expires_at=status.get("expires_at", datetime.utcnow()).isoformat(),
-            viewed=current_user.id in status.get("viewers", []),
-            views_count=len(status.get("viewers", []))
-        ))
-    
-    return result
+    }, STATUS_PROJECTION).sort("created_at", -1).limit(limit).to_list(length=limit)
+    
+    # Which of these the current user has seen, in one query
+    views = await db.status_views.find({
+        "status_id": {"$in": [str(s["_id"]) for s in statuses]},
+        "viewer_id": current_user.id
+    }, {"status_id": 1}).to_list(length=len(statuses))
+    viewed_ids = {v["status_id"] for v in views}
+    
+    return [format_status(s, viewed=str(s["_id"]) in viewed_ids) for s in statuses]
+
+
+@router.get("/feed", response_model=List[StatusAuthorGroup])
+async def get_status_feed(
+    current_user: User = Depends(get_current_user)
+):
+    """Get contacts' live statuses grouped per author, unseen first"""
+    
+    db = get_database()
+    
+    feed = await get_feed(db, current_user.id)
+    
+    return [
+        StatusAuthorGroup(
+            user_id=group["user_id"],
+            contact_name=group["contact_name"],
+            contact_phone=group["contact_phone"],
+            has_unseen=group["has_unseen"],
+            latest_at=group["latest_at"].isoformat(),
+            statuses=[format_status(s, viewed=s["viewed"]) for s in group["statuses"]]
+        )
+        for group in feed
+    ]
+
+
+@router.post("/views")
+async def mark_statuses_viewed(
+    request: MarkViewedRequest,
+    current_user: User = Depends(get_current_user)
+):
+    """Mark several statuses as viewed in one batch"""
+    
+    db = get_database()
+    
+    status_ids = list(dict.fromkeys(request.status_ids))
+    try:
+        object_ids = [ObjectId(sid) for sid in status_ids]
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid status id"
+        )
+    
+    # Only live statuses can be viewed; their expiry is copied onto the view rows
+    live = await db.status_updates.find(
+        {"_id": {"$in": object_ids}, "expires_at": {"$gt": datetime.utcnow()}},
+        {"expires_at": 1}
+    ).to_list(length=len(object_ids))
+    
+    if not live:
+        return {"marked": 0, "new_views": 0}
+    
+    now = datetime.utcnow()
+    view_ops = [
+        UpdateOne(
+            {"status_id": str(s["_id"]), "viewer_id": current_user.id},
+            {"$setOnInsert": {"viewed_at": now, "expires_at": s["expires_at"]}},
+            upsert=True
+        )
+        for s in live
+    ]
+    result = await db.status_views.bulk_write(view_ops, ordered=False)
+    
+    # upserted_ids maps op index -> id, i.e. the statuses viewed for the first time
+    new_ids = [live[index]["_id"] for index in result.upserted_ids]
+    if new_ids:
+        await db.status_updates.update_many(
+            {"_id": {"$in": new_ids}},
+            {"$inc": {"views_count": 1}}
+        )
+        await invalidate_viewers([current_user.id])
+    
+    return {"marked": len(live), "new_views": len(new_ids)}
 
 
 @router.get("/{status_id}")
@@ -112,47 +217,57 @@ async def get_status(
 ):
     """Get a specific status and mark as viewed"""
     
-    db = get_database()
-    
-    # Get status
-    status = await db.status_updates.find_one({"_id": ObjectId(status_id)})
-    
-    if not status:
+    if not ObjectId.is_valid(status_id):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Status not found"
         )
     
-    # Check if expired
-    if status.get("expires_at", datetime.utcnow()) < datetime.utcnow():
+    db = get_database()
+    now = datetime.utcnow()
+    status_oid = ObjectId(status_id)
+    
+    # Record the view; upserted_id is only set the first time this user views it.
+    # Statuses expire STATUS_LIFETIME after their _id was minted, so the row is
+    # purged together with the status.
+    view = await db.status_views.update_one(
+        {"status_id": status_id, "viewer_id": current_user.id},
+        {"$setOnInsert": {
+            "viewed_at": now,
+            "expires_at": status_oid.generation_time.replace(tzinfo=None) + STATUS_LIFETIME
+        }},
+        upsert=True
+    )
+    first_view = view.upserted_id is not None
+    
+    # Fetch the live status and count the view in the same round trip
+    status_doc = await db.status_updates.find_one_and_update(
+        {"_id": status_oid, "expires_at": {"$gt": now}},
+        {"$inc": {"views_count": 1 if first_view else 0}},
+        projection=STATUS_PROJECTION,
+        return_document=ReturnDocument.AFTER
+    )
+    
+    if status_doc is None:
+        if first_view:
+            await db.status_views.delete_one({"_id": view.upserted_id})
+        
+        # Missing or expired; only look again to pick the right error
+        exists = await db.status_updates.find_one({"_id": status_oid}, {"_id": 1})
+        if not exists:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Status not found"
+            )
         raise HTTPException(
             status_code=status.HTTP_410_GONE,
             detail="Status has expired"
         )
     
-    # Mark as viewed by current user
-    if current_user.id not in status.get("viewers", []):
-        await db.status_updates.update_one(
-            {"_id": ObjectId(status_id)},
-            {"$addToSet": {"viewers": current_user.id}}
-        )
-    
-    # Get updated status
-    updated_status = await db.status_updates.find_one({"_id": ObjectId(status_id)})
+    if first_view:
+        await invalidate_viewers([current_user.id])
     
-    return StatusUpdate(
-        id=str(updated_status["_id"]),
-        user_id=updated_status.get("user_id", ""),
-        contact_name=updated_status.get("contact_name", ""),
-        contact_phone=updated_status.get("contact_phone", ""),
-        content=updated_status.get("content", ""),
-        media_url=updated_status.get("media_url"),
-        media_type=updated_status.get("media_type", "text"),
-        created_at=updated_status.get("created_at", datetime.utcnow()).isoformat(),
-        expires_at=updated_status.get("expires_at", datetime.utcnow()).isoformat(),
-        viewed=True,
-        views_count=len(updated_status.get("viewers", []))
-    )
+    return format_status(status_doc, viewed=True)
 
 
 @router.delete("/{status_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -174,3 +289,6 @@ async def delete_status(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Status not found or you don't have permission"
         )
+    
+    await db.status_views.delete_many({"status_id": status_id})
+    await invalidate_author(db, current_user.id)
@@ -1,8 +1,9 @@
 from fastapi import APIRouter, HTTPException, status, Depends
 from database import get_database
-from models.template import Template, TemplateCreate, TemplateUpdate, DEMO_TEMPLATES
+from models.template import Template, TemplateCreate, TemplateUpdate
 from models.user import User
 from services.auth_service import get_current_user
+from services.template_registry import list_templates, lookup_template, invalidate_user_templates
 from typing import List
 from bson import ObjectId
 from datetime import datetime
@@ -16,15 +17,7 @@ async def get_templates(current_user: User = Depends(get_current_user)):
     
     db = get_database()
     
-    # Get user's custom templates from MongoDB
-    custom_templates = await db.templates.find({"user_id": current_user.id}).to_list(length=100)
-    
-    # Format custom templates
-    for template in custom_templates:
-        template["_id"] = str(template["_id"])
-    
-    # Combine demo templates with custom templates
-    all_templates = DEMO_TEMPLATES + custom_templates
+    all_templates = await list_templates(db, current_user.id, limit=100)
     
     return [Template(**template) for template in all_templates]
 
@@ -52,6 +45,8 @@ async def create_template(
     result = await db.templates.insert_one(template_doc)
     template_doc["_id"] = str(result.inserted_id)
     
+    await invalidate_user_templates(current_user.id)
+    
     return Template(**template_doc)
 
 
@@ -64,19 +59,9 @@ async def get_template(
     
     db = get_database()
     
-    # Check if it's a demo template
-    demo_template = next((t for t in DEMO_TEMPLATES if t["_id"] == template_id), None)
-    if demo_template:
-        return Template(**demo_template)
-    
-    # Check if it's a custom template
-    try:
-        template = await db.templates.find_one({"_id": ObjectId(template_id)})
-        if template:
-            template["_id"] = str(template["_id"])
-            return Template(**template)
-    except:
-        pass
+    template = await lookup_template(db, current_user.id, template_id)
+    if template:
+        return Template(**template)
     
     raise HTTPException(
         status_code=status.HTTP_404_NOT_FOUND,
@@ -120,6 +105,8 @@ async def update_template(
     updated = await db.templates.find_one({"_id": ObjectId(template_id)})
     updated["_id"] = str(updated["_id"])
     
+    await invalidate_user_templates(current_user.id)
+    
     return Template(**updated)
 
 
@@ -142,3 +129,5 @@ async def delete_template(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Template not found or you don't have permission"
         )
+    
+    await invalidate_user_templates(current_user.id)
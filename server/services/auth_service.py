@@ -1,13 +1,33 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from database import get_database
+from config import settings
+from services.cache_bus import cache_bus
+from utils.cache import TTLCache
 from utils.security import decode_access_token
+from services.token_revocation import token_denylist
 from models.user import User
 from bson import ObjectId
 from typing import Optional
 
 security = HTTPBearer()
 
+# user_id -> User; spares a users lookup on every authenticated request
+user_cache = TTLCache(
+    name="auth_users",
+    maxsize=settings.user_cache_size,
+    ttl=settings.user_cache_ttl_seconds
+)
+
+USER_CHANNEL = "auth_user"
+
+cache_bus.subscribe(USER_CHANNEL, user_cache.pop)
+
+
+async def invalidate_user(user_id: str):
+    """Drop a cached user here and on every other worker after it changes"""
+    await cache_bus.publish(USER_CHANNEL, user_id)
+
 
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security)
@@ -26,10 +46,18 @@ async def get_current_user(
     if payload is None:
         raise credentials_exception
     
+    await token_denylist.refresh(get_database())
+    if token_denylist.is_revoked(payload):
+        raise credentials_exception
+    
     user_id: str = payload.get("sub")
     if user_id is None:
         raise credentials_exception
     
+    user = user_cache.get(user_id)
+    if user is not None:
+        return user
+    
     # Get user from database
     db = get_database()
     user_doc = await db.users.find_one({"_id": ObjectId(user_id)})
@@ -40,7 +68,10 @@ async def get_current_user(
     # Convert ObjectId to string
     user_doc["_id"] = str(user_doc["_id"])
     
-    return User(**user_doc)
+    user = User(**user_doc)
+    user_cache.set(user_id, user)
+    
+    return user
 
 
 async def get_optional_user(
@@ -0,0 +1,181 @@
+from config import settings
+from services import counter_service
+from bson import ObjectId
+from datetime import datetime
+from pymongo.errors import BulkWriteError
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class DeliveryMode:
+    """How a channel post's audience is recorded"""
+    FANOUT = "fanout"  # One channel_deliveries row per follower
+    RANGE = "range"    # Followers up to a cutoff _id; rows only created on view
+
+
+class DeliveryStatus:
+    """Progress of a channel post's broadcast"""
+    PENDING = "pending"
+    IN_PROGRESS = "in_progress"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+async def _record_batch(db, message_id: str, channel_id: str, user_ids: list) -> int:
+    """Insert one batch of deliveries; duplicates from a retried run are skipped"""
+    now = datetime.utcnow()
+    docs = [
+        {
+            "message_id": message_id,
+            "channel_id": channel_id,
+            "user_id": user_id,
+            "delivered_at": now,
+            "viewed_at": None
+        }
+        for user_id in user_ids
+    ]
+    
+    try:
+        result = await db.channel_deliveries.insert_many(docs, ordered=False)
+        return len(result.inserted_ids)
+    except BulkWriteError as e:
+        if any(error.get("code") != 11000 for error in e.details.get("writeErrors", [])):
+            raise
+        return e.details.get("nInserted", 0)
+
+
+async def _flush(db, message_oid: ObjectId, channel_id: str, user_ids: list) -> int:
+    """Record a batch and add it to the post's delivered_count"""
+    inserted = await _record_batch(db, str(message_oid), channel_id, user_ids)
+    if inserted:
+        await db.channel_messages.update_one(
+            {"_id": message_oid},
+            {"$inc": {"delivered_count": inserted}}
+        )
+    return inserted
+
+
+async def broadcast_channel_message(db, channel_id: str, message_id: str):
+    """
+    Deliver a channel post to its followers
+    
+    Follower ids are streamed from channel_followers in ``_id`` order and
+    recorded with one bulk insert per ``broadcast_batch_size`` followers,
+    bumping the post's ``delivered_count`` as each batch lands. Channels
+    with more than ``broadcast_fanout_max_followers`` followers only store
+    a range marker (the newest follower ``_id`` at posting time); their
+    delivery rows are created lazily when a follower views the post.
+    """
+    message_oid = ObjectId(message_id)
+    
+    try:
+        channel = await db.channels.find_one({"_id": ObjectId(channel_id), "deleted_at": None}, {"followers_count": 1})
+        if not channel:
+            return
+        
+        channel["_id"] = channel_id
+        await counter_service.apply_counts(db, "channels", [channel])
+        followers_count = channel.get("followers_count", 0)
+        
+        if followers_count > settings.broadcast_fanout_max_followers:
+            newest = await db.channel_followers.find_one(
+                {"channel_id": channel_id},
+                {"_id": 1},
+                sort=[("_id", -1)]
+            )
+            await db.channel_messages.update_one(
+                {"_id": message_oid},
+                {"$set": {
+                    "delivery_mode": DeliveryMode.RANGE,
+                    "audience_cutoff_id": newest["_id"] if newest else None,
+                    "delivered_count": followers_count,
+                    "delivery_status": DeliveryStatus.COMPLETED
+                }}
+            )
+            logger.info(f"Channel message {message_id} recorded as range delivery to {followers_count} followers")
+            return
+        
+        await db.channel_messages.update_one(
+            {"_id": message_oid},
+            {"$set": {"delivery_mode": DeliveryMode.FANOUT, "delivery_status": DeliveryStatus.IN_PROGRESS}}
+        )
+        
+        cursor = db.channel_followers.find(
+            {"channel_id": channel_id},
+            {"user_id": 1}
+        ).sort("_id", 1).batch_size(settings.broadcast_batch_size)
+        
+        batch = []
+        delivered = 0
+        async for follower in cursor:
+            batch.append(follower["user_id"])
+            if len(batch) >= settings.broadcast_batch_size:
+                delivered += await _flush(db, message_oid, channel_id, batch)
+                batch = []
+        
+        if batch:
+            delivered += await _flush(db, message_oid, channel_id, batch)
+        
+        await db.channel_messages.update_one(
+            {"_id": message_oid},
+            {"$set": {"delivery_status": DeliveryStatus.COMPLETED}}
+        )
+        logger.info(f"Channel message {message_id} delivered to {delivered} followers")
+        
+    except Exception as e:
+        logger.error(f"Error broadcasting channel message {message_id}: {e}")
+        await db.channel_messages.update_one(
+            {"_id": message_oid},
+            {"$set": {"delivery_status": DeliveryStatus.FAILED}}
+        )
+
+
+async def in_audience(db, message: dict, user_id: str) -> bool:
+    """
+    Whether a user is in a post's audience
+    
+    The user must follow the channel; for range posts they must also have
+    followed before the post's ``audience_cutoff_id``.
+    """
+    follower = await db.channel_followers.find_one(
+        {"channel_id": message["channel_id"], "user_id": user_id},
+        {"_id": 1}
+    )
+    if not follower:
+        return False
+    
+    if message.get("delivery_mode") == DeliveryMode.RANGE:
+        cutoff = message.get("audience_cutoff_id")
+        return cutoff is not None and follower["_id"] <= cutoff
+    return True
+
+
+async def record_view(db, message: dict, user_id: str) -> bool:
+    """
+    Mark a post as viewed by a user; returns True on their first view
+    
+    A single upsert covers both modes: fan-out posts already have the
+    delivery row, range posts get it created here. Callers check
+    ``in_audience`` first.
+    """
+    message_id = str(message["_id"])
+    now = datetime.utcnow()
+    
+    previous = await db.channel_deliveries.find_one_and_update(
+        {"message_id": message_id, "user_id": user_id},
+        {
+            "$set": {"viewed_at": now},
+            "$setOnInsert": {"channel_id": message["channel_id"], "delivered_at": now}
+        },
+        projection={"viewed_at": 1},
+        upsert=True
+    )
+    
+    first_view = previous is None or previous.get("viewed_at") is None
+    if first_view:
+        await db.channel_messages.update_one(
+            {"_id": message["_id"]},
+            {"$inc": {"viewed_count": 1}}
+        )
+    return first_view
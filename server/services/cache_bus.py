@@ -0,0 +1,123 @@
+import asyncio
+from database import get_database
+from config import settings
+from bson import ObjectId
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List
+import logging
+import uuid
+
+logger = logging.getLogger(__name__)
+
+
+class CacheInvalidationBus:
+    """
+    Pushes cache invalidations to every worker process
+
+    Invalidations are applied locally right away and appended to the
+    ``cache_invalidations`` collection (TTL-indexed, so it stays small).
+    Each long-running worker polls that collection for entries written by
+    other processes and replays them to the local subscribers.
+
+    Entries are stamped with the server's clock (``$$NOW``), so no
+    publisher's clock or shared counter decides the order. Each poll
+    re-reads the last ``overlap`` seconds, catching inserts that commit
+    after a newer entry was already seen; entries are deduplicated by
+    ``_id``.
+    """
+
+    def __init__(self, poll_interval: float = 1.0, overlap: float = 10.0):
+        self.origin = uuid.uuid4().hex
+        self.poll_interval = poll_interval
+        self.overlap = timedelta(seconds=overlap)
+        self._handlers: Dict[str, List[Callable[[str], None]]] = {}
+        self._task: asyncio.Task = None
+        self._watermark: datetime = None  # Newest server timestamp seen
+        self._seen: Dict[ObjectId, datetime] = {}
+
+    def subscribe(self, channel: str, handler: Callable[[str], None]):
+        """Register a handler called with the key of each invalidation"""
+        self._handlers.setdefault(channel, []).append(handler)
+
+    def _dispatch(self, channel: str, key: str):
+        for handler in self._handlers.get(channel, []):
+            try:
+                handler(key)
+            except Exception as e:
+                logger.error(f"Cache invalidation handler failed for {channel}: {e}")
+
+    async def publish(self, channel: str, key: str):
+        """Invalidate ``key`` on ``channel`` in this process and all others"""
+        self._dispatch(channel, key)
+
+        if not settings.cache_bus_enabled:
+            return
+
+        try:
+            db = get_database()
+            await db.cache_invalidations.update_one(
+                {"_id": ObjectId()},
+                [{"$set": {
+                    "channel": channel,
+                    "key": key,
+                    "origin": self.origin,
+                    "created_at": "$$NOW"
+                }}],
+                upsert=True
+            )
+        except Exception as e:
+            # Other workers fall back to TTL expiry
+            logger.warning(f"Failed to publish cache invalidation: {e}")
+
+    async def _poll(self):
+        db = get_database()
+        since = self._watermark - self.overlap
+
+        cursor = db.cache_invalidations.find({"created_at": {"$gte": since}}).sort("created_at", 1)
+        async for entry in cursor:
+            if entry["_id"] in self._seen:
+                continue
+            self._seen[entry["_id"]] = entry["created_at"]
+            self._watermark = max(self._watermark, entry["created_at"])
+
+            if entry["origin"] != self.origin:
+                self._dispatch(entry["channel"], entry["key"])
+
+        since = self._watermark - self.overlap
+        self._seen = {entry_id: at for entry_id, at in self._seen.items() if at >= since}
+
+    async def _run(self):
+        while True:
+            try:
+                await self._poll()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Cache invalidation poll failed: {e}")
+            await asyncio.sleep(self.poll_interval)
+
+    async def start(self):
+        """Start following invalidations published by other workers"""
+        if self._task is None:
+            hello = await get_database().command("hello")
+            self._watermark = hello["localTime"].replace(tzinfo=None)
+            self._seen = {}
+            self._task = asyncio.create_task(self._run())
+            logger.info("Cache invalidation bus started")
+
+    async def stop(self):
+        """Stop the polling task"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+# Singleton instance
+cache_bus = CacheInvalidationBus(
+    poll_interval=settings.cache_bus_poll_interval_seconds,
+    overlap=settings.cache_bus_overlap_seconds
+)
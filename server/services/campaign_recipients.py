@@ -0,0 +1,60 @@
+from bson import ObjectId
+from typing import AsyncIterator, Dict, List
+
+# Recipient rows written and read per round trip
+RECIPIENT_BATCH_SIZE = 1000
+
+
+async def record_recipients(db, recipients: List[Dict]):
+    """Store one batch of (campaign, contact, thread, message) rows"""
+    if recipients:
+        await db.campaign_recipients.insert_many(recipients, ordered=False)
+
+
+async def iter_recipient_batches(db, campaign: dict, batch_size: int = RECIPIENT_BATCH_SIZE) -> AsyncIterator[List[Dict]]:
+    """
+    Stream a campaign's recipients in batches of ``batch_size``
+
+    Each recipient has ``contact_id`` and ``message_id`` (an ObjectId).
+    Campaigns created before recipients moved out of the campaign document
+    are served from its ``contact_ids``/``message_ids`` lists instead.
+    """
+    if "message_ids" in campaign:
+        message_ids = campaign.get("message_ids", [])
+        contact_ids = campaign.get("contact_ids", [])
+        for start in range(0, len(message_ids), batch_size):
+            yield [
+                {"contact_id": contact_id, "message_id": ObjectId(message_id)}
+                for contact_id, message_id in zip(
+                    contact_ids[start:start + batch_size],
+                    message_ids[start:start + batch_size]
+                )
+            ]
+        return
+
+    cursor = db.campaign_recipients.find(
+        {"campaign_id": str(campaign["_id"])},
+        {"contact_id": 1, "message_id": 1}
+    ).sort("_id", 1).batch_size(batch_size)
+
+    batch = []
+    async for recipient in cursor:
+        batch.append(recipient)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def message_status_counts(db, campaign: dict) -> Dict[str, int]:
+    """Number of a campaign's messages in each status, one aggregation per batch"""
+    counts: Dict[str, int] = {}
+    async for batch in iter_recipient_batches(db, campaign):
+        pipeline = [
+            {"$match": {"_id": {"$in": [r["message_id"] for r in batch]}}},
+            {"$group": {"_id": "$status", "count": {"$sum": 1}}}
+        ]
+        async for doc in db.messages.aggregate(pipeline):
+            counts[doc["_id"]] = counts.get(doc["_id"], 0) + doc["count"]
+    return counts
@@ -0,0 +1,95 @@
+import asyncio
+from database import get_database
+from config import settings
+from datetime import datetime, timedelta
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Child collections removed before the tombstoned channel document itself
+CASCADE_COLLECTIONS = [
+    "channel_followers", "channel_deliveries", "channel_message_views",
+    "channel_reach_daily", "channel_messages"
+]
+
+# Reads exclude tombstoned channels with this filter
+LIVE_CHANNEL = {"deleted_at": None}
+
+
+async def _claim_channel(db):
+    """
+    Lease one tombstoned channel for reaping
+    
+    The lease lets several workers share the backlog; if a worker dies,
+    its lease expires and another one resumes the channel.
+    """
+    now = datetime.utcnow()
+    return await db.channels.find_one_and_update(
+        {
+            "deleted_at": {"$ne": None},
+            "$or": [
+                {"reaper_lease_until": None},
+                {"reaper_lease_until": {"$lt": now}}
+            ]
+        },
+        {"$set": {"reaper_lease_until": now + timedelta(seconds=settings.channel_reaper_lease_seconds)}},
+        sort=[("deleted_at", 1)]
+    )
+
+
+async def reap_channel(db, channel: dict):
+    """
+    Remove a tombstoned channel's children in throttled batches
+    
+    Each batch deletes at most ``channel_reaper_batch_size`` documents by
+    ``_id`` and records progress on the channel document. Deletes are
+    idempotent, so a crashed run simply picks up whatever is left.
+    """
+    channel_id = str(channel["_id"])
+    
+    for collection_name in CASCADE_COLLECTIONS:
+        collection = db[collection_name]
+        
+        while True:
+            batch = await collection.find(
+                {"channel_id": channel_id},
+                {"_id": 1}
+            ).limit(settings.channel_reaper_batch_size).to_list(length=settings.channel_reaper_batch_size)
+            
+            if not batch:
+                break
+            
+            result = await collection.delete_many({"_id": {"$in": [doc["_id"] for doc in batch]}})
+            
+            # Report progress and extend the lease
+            await db.channels.update_one(
+                {"_id": channel["_id"]},
+                {
+                    "$inc": {f"deletion_progress.{collection_name}": result.deleted_count},
+                    "$set": {"reaper_lease_until": datetime.utcnow() + timedelta(seconds=settings.channel_reaper_lease_seconds)}
+                }
+            )
+            
+            await asyncio.sleep(settings.channel_reaper_pause_seconds)
+    
+    await db.counter_shards.delete_many({"entity": "channels", "entity_id": channel_id})
+    await db.channels.delete_one({"_id": channel["_id"]})
+    logger.info(f"Finished reaping channel {channel_id}")
+
+
+async def run_channel_reaper():
+    """Reap tombstoned channels one at a time"""
+    while True:
+        try:
+            db = get_database()
+            channel = await _claim_channel(db)
+            while channel:
+                logger.info(f"Reaping deleted channel {channel['_id']}")
+                await reap_channel(db, channel)
+                channel = await _claim_channel(db)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Error reaping deleted channels: {e}")
+        
+        await asyncio.sleep(settings.channel_reaper_interval_seconds)
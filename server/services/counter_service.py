@@ -0,0 +1,181 @@
+import asyncio
+from database import get_database
+from config import settings
+from utils.cache import TTLCache
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List
+import logging
+import random
+
+logger = logging.getLogger(__name__)
+
+# parent collection -> (counter field, membership collection, membership foreign key)
+COUNTERS = {
+    "channels": ("followers_count", "channel_followers", "channel_id"),
+    "communities": ("members_count", "community_members", "community_id"),
+    "groups": ("members_count", "group_members", "group_id"),
+}
+
+# (entity, entity_id) -> sum of that entity's shards
+shard_totals_cache = TTLCache(
+    name="counter_shard_totals",
+    maxsize=20000,
+    ttl=settings.counter_cache_ttl_seconds
+)
+
+
+async def increment(db, entity: str, entity_id: str, delta: int = 1):
+    """
+    Add ``delta`` to an entity's counter without touching the parent document
+
+    Writes go to one of ``counter_shard_count`` shard documents picked at
+    random, so concurrent follows/joins on a hot entity don't serialize on
+    a single document. The parent's counter field holds the value as of
+    the last reconcile; shards hold the changes since.
+    """
+    slot = random.randrange(settings.counter_shard_count)
+    await db.counter_shards.update_one(
+        {"entity": entity, "entity_id": entity_id, "slot": slot},
+        {"$inc": {"value": delta}},
+        upsert=True
+    )
+    shard_totals_cache.pop((entity, entity_id))
+
+
+async def _shard_totals(db, entity: str, entity_ids: List[str]) -> Dict[str, int]:
+    """Summed shard values for several entities, served from cache when warm"""
+    totals = {}
+    missing = []
+    
+    for entity_id in entity_ids:
+        cached = shard_totals_cache.get((entity, entity_id))
+        if cached is None:
+            missing.append(entity_id)
+        else:
+            totals[entity_id] = cached
+    
+    if missing:
+        pipeline = [
+            {"$match": {"entity": entity, "entity_id": {"$in": missing}}},
+            {"$group": {"_id": "$entity_id", "value": {"$sum": "$value"}}}
+        ]
+        summed = {doc["_id"]: doc["value"] async for doc in db.counter_shards.aggregate(pipeline)}
+        
+        for entity_id in missing:
+            totals[entity_id] = summed.get(entity_id, 0)
+            shard_totals_cache.set((entity, entity_id), totals[entity_id])
+    
+    return totals
+
+
+async def apply_counts(db, entity: str, docs: Iterable[dict]):
+    """
+    Add pending shard totals onto parent documents in place
+
+    ``docs`` must already have string ``_id`` values. One aggregation
+    covers the whole list (none when every total is cached).
+    """
+    docs = list(docs)
+    if not docs:
+        return
+    
+    field = COUNTERS[entity][0]
+    totals = await _shard_totals(db, entity, [doc["_id"] for doc in docs])
+    
+    for doc in docs:
+        doc[field] = max(doc.get(field, 0) + totals.get(doc["_id"], 0), 0)
+
+
+async def reconcile(db, entity: str) -> int:
+    """
+    Rebuild an entity type's counters from its membership collection
+
+    The shard values are read first, then the true counts are written to
+    the parent documents (only where they differ), which also corrects any
+    drift. Each shard is then decremented by the value that was read, so
+    increments landing while the reconcile runs are kept rather than lost.
+    Returns the number of parent documents updated.
+    """
+    field, membership_collection, foreign_key = COUNTERS[entity]
+    
+    snapshot = await db.counter_shards.find(
+        {"entity": entity, "value": {"$ne": 0}},
+        {"value": 1}
+    ).to_list(length=None)
+    
+    pipeline = [{"$group": {"_id": f"${foreign_key}", "count": {"$sum": 1}}}]
+    counts = {
+        doc["_id"]: doc["count"]
+        async for doc in db[membership_collection].aggregate(pipeline)
+    }
+    
+    updates = []
+    updated = 0
+    async for parent in db[entity].find({}, {field: 1}):
+        true_count = counts.get(str(parent["_id"]), 0)
+        if parent.get(field) != true_count:
+            updates.append(UpdateOne({"_id": parent["_id"]}, {"$set": {field: true_count}}))
+        
+        if len(updates) >= 1000:
+            await db[entity].bulk_write(updates, ordered=False)
+            updated += len(updates)
+            updates = []
+    
+    if updates:
+        await db[entity].bulk_write(updates, ordered=False)
+        updated += len(updates)
+    
+    for start in range(0, len(snapshot), 1000):
+        await db.counter_shards.bulk_write([
+            UpdateOne({"_id": shard["_id"]}, {"$inc": {"value": -shard["value"]}})
+            for shard in snapshot[start:start + 1000]
+        ], ordered=False)
+    await db.counter_shards.delete_many({"entity": entity, "value": 0})
+    shard_totals_cache.invalidate_where(lambda key: key[0] == entity)
+    
+    return updated
+
+
+async def _claim_reconcile(db) -> bool:
+    """Lease the next reconcile run so only one worker performs it"""
+    now = datetime.utcnow()
+    try:
+        # Matches an expired lease, or inserts the document on first use
+        await db.job_leases.find_one_and_update(
+            {
+                "_id": "counter_reconcile",
+                "$or": [
+                    {"lease_until": None},
+                    {"lease_until": {"$lt": now}}
+                ]
+            },
+            {"$set": {"lease_until": now + timedelta(seconds=settings.counter_reconcile_interval_seconds)}},
+            upsert=True
+        )
+    except DuplicateKeyError:
+        # Another worker holds the lease
+        return False
+    return True
+
+
+async def run_reconciler():
+    """Periodically rebuild every sharded counter on one worker at a time"""
+    while True:
+        await asyncio.sleep(settings.counter_reconcile_interval_seconds)
+        
+        db = get_database()
+        try:
+            if not await _claim_reconcile(db):
+                continue
+        except Exception as e:
+            logger.error(f"Error leasing counter reconcile: {e}")
+            continue
+        
+        for entity in COUNTERS:
+            try:
+                updated = await reconcile(db, entity)
+                logger.info(f"Reconciled {entity} counters ({updated} corrected)")
+            except Exception as e:
+                logger.error(f"Error reconciling {entity} counters: {e}")
@@ -0,0 +1,229 @@
+from config import settings
+from services.sheet_source import SheetSource, parse_rows
+from utils.executor import BoundedExecutor
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import unquote, urlparse
+import csv
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_EXTENSIONS = {".csv", ".xlsx", ".parquet"}
+
+# Local file reads are blocking too; kept apart from the Google pool
+local_sheets_executor = BoundedExecutor(
+    name="local_sheets",
+    max_workers=settings.local_sheets_max_workers,
+    max_queue=settings.sheets_max_queue,
+    timeout=settings.sheets_call_timeout_seconds
+)
+
+
+class _BatchReader:
+    """
+    Pulls batches from a blocking generator on executor threads
+
+    A read that times out keeps running on its thread, so the generator
+    is never closed from outside: ``stop`` closes it if no read is in
+    progress, otherwise the running read closes it when it returns.
+    """
+
+    def __init__(self, batches: Iterator[List[Dict[str, str]]]):
+        self._batches = batches
+        self._lock = threading.Lock()
+        self._stopped = False
+
+    def read(self) -> Optional[List[Dict[str, str]]]:
+        """Next batch, or None at the end or once stopped"""
+        with self._lock:
+            if self._stopped:
+                self._batches.close()
+                return None
+            batch = next(self._batches, None)
+            if self._stopped:
+                self._batches.close()
+            return batch
+
+    def stop(self):
+        """Close the generator now if idle, otherwise after the running read"""
+        self._stopped = True
+        if self._lock.acquire(blocking=False):
+            try:
+                self._batches.close()
+            finally:
+                self._lock.release()
+
+
+class LocalFileSheetSource(SheetSource):
+    """
+    Reads CSV, XLSX and Parquet files addressed as ``file:///<path>``
+
+    Paths are resolved inside ``root`` and may not escape it. CSV and
+    Parquet files have a single tab named after the file; XLSX files
+    expose their worksheets. XLSX needs ``openpyxl`` and Parquet needs
+    ``pyarrow``.
+    """
+
+    executor = local_sheets_executor
+    name = "local file"
+
+    def __init__(self, root: str):
+        self.root = os.path.realpath(root)
+
+    def resolve_path(self, sheet_url: str) -> str:
+        """Map a ``file://`` URL to a file under the root"""
+        relative = unquote(urlparse(sheet_url).path).lstrip("/")
+        path = os.path.realpath(os.path.join(self.root, relative))
+
+        if os.path.commonpath([self.root, path]) != self.root:
+            raise Exception("File path is outside the allowed directory")
+        if os.path.splitext(path)[1].lower() not in SUPPORTED_EXTENSIONS:
+            raise Exception("Unsupported file type. Use CSV, XLSX or Parquet.")
+        if not os.path.isfile(path):
+            raise Exception("File not found")
+
+        return path
+
+    async def get_sheet_names(self, sheet_url: str) -> List[str]:
+        """XLSX worksheet names, or the file name for single-tab formats"""
+        path = self.resolve_path(sheet_url)
+        if path.lower().endswith(".xlsx"):
+            return await self._run(self._xlsx_sheet_names, path)
+        return [os.path.splitext(os.path.basename(path))[0]]
+
+    async def iter_sheet_rows(
+        self,
+        sheet_url: str,
+        sheet_name: Optional[str] = None,
+        batch_rows: Optional[int] = None
+    ) -> AsyncIterator[List[Dict[str, str]]]:
+        """Stream a file as batches of record dicts, one executor call per batch"""
+        path = self.resolve_path(sheet_url)
+        reader = _BatchReader(self._batches(path, sheet_name, batch_rows or settings.sheet_read_batch_rows))
+
+        try:
+            while True:
+                batch = await self._run(reader.read)
+                if batch is None:
+                    break
+                yield batch
+        finally:
+            await self._run(reader.stop)
+
+    async def preview_sheet(
+        self,
+        sheet_url: str,
+        sheet_name: Optional[str] = None,
+        rows: int = 10
+    ) -> Tuple[List[Dict[str, str]], int]:
+        """First ``rows`` records and the file's row count"""
+        path = self.resolve_path(sheet_url)
+        reader = _BatchReader(self._batches(path, sheet_name, rows))
+
+        # Blank rows are dropped per batch, so keep reading until enough remain
+        preview = []
+        try:
+            while len(preview) < rows:
+                batch = await self._run(reader.read)
+                if batch is None:
+                    break
+                preview.extend(batch)
+        finally:
+            await self._run(reader.stop)
+        preview = preview[:rows]
+
+        total_rows = await self._run(self._count_rows, path, sheet_name)
+        return preview, max(total_rows, len(preview))
+
+    def _batches(self, path: str, sheet_name: Optional[str], batch_rows: int) -> Iterator[List[Dict[str, str]]]:
+        extension = os.path.splitext(path)[1].lower()
+        if extension == ".csv":
+            return self._csv_batches(path, batch_rows)
+        if extension == ".xlsx":
+            return self._xlsx_batches(path, sheet_name, batch_rows)
+        return self._parquet_batches(path, batch_rows)
+
+    @staticmethod
+    def _chunked(header: List[str], rows: Iterator[list], batch_rows: int) -> Iterator[List[Dict[str, str]]]:
+        values = []
+        for row in rows:
+            values.append(list(row))
+            if len(values) >= batch_rows:
+                batch = parse_rows(header, values)
+                values = []
+                if batch:
+                    yield batch
+        batch = parse_rows(header, values)
+        if batch:
+            yield batch
+
+    def _csv_batches(self, path: str, batch_rows: int) -> Iterator[List[Dict[str, str]]]:
+        with open(path, newline="", encoding="utf-8-sig") as handle:
+            reader = csv.reader(handle)
+            header = next(reader, None)
+            if header:
+                yield from self._chunked(header, reader, batch_rows)
+
+    def _xlsx_batches(self, path: str, sheet_name: Optional[str], batch_rows: int) -> Iterator[List[Dict[str, str]]]:
+        workbook = self._open_workbook(path)
+        try:
+            worksheet = workbook[sheet_name] if sheet_name else workbook.worksheets[0]
+            rows = worksheet.iter_rows(values_only=True)
+            header = next(rows, None)
+            if header:
+                yield from self._chunked(["" if h is None else str(h) for h in header], rows, batch_rows)
+        finally:
+            workbook.close()
+
+    def _parquet_batches(self, path: str, batch_rows: int) -> Iterator[List[Dict[str, str]]]:
+        parquet_file = self._open_parquet(path)
+        header = parquet_file.schema_arrow.names
+        for record_batch in parquet_file.iter_batches(batch_size=batch_rows):
+            columns = record_batch.to_pydict()
+            batch = parse_rows(header, [list(row) for row in zip(*(columns[name] for name in header))])
+            if batch:
+                yield batch
+
+    def _count_rows(self, path: str, sheet_name: Optional[str]) -> int:
+        extension = os.path.splitext(path)[1].lower()
+        if extension == ".csv":
+            with open(path, newline="", encoding="utf-8-sig") as handle:
+                return max(sum(1 for _ in csv.reader(handle)) - 1, 0)
+        if extension == ".xlsx":
+            workbook = self._open_workbook(path)
+            try:
+                worksheet = workbook[sheet_name] if sheet_name else workbook.worksheets[0]
+                return max((worksheet.max_row or 1) - 1, 0)
+            finally:
+                workbook.close()
+        return self._open_parquet(path).metadata.num_rows
+
+    def _xlsx_sheet_names(self, path: str) -> List[str]:
+        workbook = self._open_workbook(path)
+        try:
+            return list(workbook.sheetnames)
+        finally:
+            workbook.close()
+
+    @staticmethod
+    def _open_workbook(path: str):
+        try:
+            from openpyxl import load_workbook
+        except ImportError:
+            raise Exception("Reading XLSX files requires the openpyxl package")
+        return load_workbook(path, read_only=True, data_only=True)
+
+    @staticmethod
+    def _open_parquet(path: str):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise Exception("Reading Parquet files requires the pyarrow package")
+        return pq.ParquetFile(path)
+
+
+def user_sheet_root(user_id: str) -> str:
+    """Directory holding a user's uploaded and locally provided sheets"""
+    return os.path.join(settings.sheet_local_root, user_id)
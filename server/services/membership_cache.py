@@ -0,0 +1,74 @@
+from fastapi import HTTPException, status
+from config import settings
+from services.cache_bus import cache_bus
+from utils.cache import TTLCache
+from bson import ObjectId
+
+# (group_id, user_id) -> {"role": ...}; only confirmed memberships are cached
+membership_cache = TTLCache(
+    name="group_membership",
+    maxsize=settings.membership_cache_size,
+    ttl=settings.membership_cache_ttl_seconds
+)
+
+MEMBERSHIP_CHANNEL = "group_membership"
+GROUP_CHANNEL = "group_memberships"
+
+
+def _on_invalidate(key: str):
+    group_id, user_id = key.split(":", 1)
+    membership_cache.pop((group_id, user_id))
+
+
+def _on_invalidate_group(group_id: str):
+    membership_cache.invalidate_where(lambda key: key[0] == group_id)
+
+
+cache_bus.subscribe(MEMBERSHIP_CHANNEL, _on_invalidate)
+cache_bus.subscribe(GROUP_CHANNEL, _on_invalidate_group)
+
+
+async def require_group_member(db, group_id: str, user_id: str, detail: str) -> dict:
+    """
+    Authorize a group action, answering from memory for known members
+
+    On a miss this falls back to the group and membership lookups and
+    caches the result. Raises 404 if the group is missing and 403 with
+    ``detail`` if the user is not a member.
+    """
+    key = (group_id, user_id)
+    membership = membership_cache.get(key)
+    if membership is not None:
+        return membership
+    
+    group = await db.groups.find_one({"_id": ObjectId(group_id)}, {"_id": 1})
+    if not group:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Group not found"
+        )
+    
+    member = await db.group_members.find_one({
+        "group_id": group_id,
+        "user_id": user_id
+    })
+    
+    if not member:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=detail
+        )
+    
+    membership = {"role": member.get("role", "member")}
+    membership_cache.set(key, membership)
+    return membership
+
+
+async def invalidate_membership(group_id: str, user_id: str):
+    """Drop a cached membership here and on every other worker"""
+    await cache_bus.publish(MEMBERSHIP_CHANNEL, f"{group_id}:{user_id}")
+
+
+async def invalidate_group_memberships(group_id: str):
+    """Drop every cached membership of a group, e.g. after a bulk removal"""
+    await cache_bus.publish(GROUP_CHANNEL, group_id)
@@ -0,0 +1,238 @@
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Tuple
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+# Operator keywords are case-insensitive; everything else is a tag
+_KEYWORDS = {"AND", "OR", "NOT"}
+_TOKEN_RE = re.compile(r'\s*(?:(\()|(\))|"([^"]*)"|([^\s()"]+))')
+
+
+class SegmentExpressionError(ValueError):
+    """Raised when a segment tag expression cannot be parsed"""
+    pass
+
+
+def _tokenize(expression: str) -> List[Tuple[str, str]]:
+    """Split an expression into (kind, value) tokens"""
+    tokens = []
+    position = 0
+    expression = expression.rstrip()
+
+    while position < len(expression):
+        match = _TOKEN_RE.match(expression, position)
+        if not match or match.end() == position:
+            raise SegmentExpressionError(f"Unexpected character at position {position}")
+
+        lparen, rparen, quoted, word = match.groups()
+        if lparen:
+            tokens.append(("(", lparen))
+        elif rparen:
+            tokens.append((")", rparen))
+        elif quoted is not None:
+            tokens.append(("tag", quoted))
+        elif word.upper() in _KEYWORDS:
+            tokens.append((word.upper(), word))
+        else:
+            tokens.append(("tag", word))
+
+        position = match.end()
+
+    return tokens
+
+
+class _Parser:
+    """
+    Recursive-descent parser for tag expressions
+
+    Grammar (NOT binds tighter than AND, which binds tighter than OR):
+        expr   := term (OR term)*
+        term   := factor (AND factor)*
+        factor := NOT factor | '(' expr ')' | tag
+    """
+
+    def __init__(self, tokens: List[Tuple[str, str]]):
+        self.tokens = tokens
+        self.position = 0
+
+    def _peek(self) -> Optional[str]:
+        if self.position < len(self.tokens):
+            return self.tokens[self.position][0]
+        return None
+
+    def _next(self) -> Tuple[str, str]:
+        token = self.tokens[self.position]
+        self.position += 1
+        return token
+
+    def parse(self) -> tuple:
+        if not self.tokens:
+            raise SegmentExpressionError("Expression is empty")
+
+        node = self._expr()
+        if self._peek() is not None:
+            raise SegmentExpressionError(f"Unexpected token '{self.tokens[self.position][1]}'")
+        return node
+
+    def _expr(self) -> tuple:
+        nodes = [self._term()]
+        while self._peek() == "OR":
+            self._next()
+            nodes.append(self._term())
+        return nodes[0] if len(nodes) == 1 else ("or", nodes)
+
+    def _term(self) -> tuple:
+        nodes = [self._factor()]
+        while self._peek() == "AND":
+            self._next()
+            nodes.append(self._factor())
+        return nodes[0] if len(nodes) == 1 else ("and", nodes)
+
+    def _factor(self) -> tuple:
+        kind = self._peek()
+
+        if kind is None:
+            raise SegmentExpressionError("Unexpected end of expression")
+
+        if kind == "NOT":
+            self._next()
+            return ("not", self._factor())
+
+        if kind == "(":
+            self._next()
+            node = self._expr()
+            if self._peek() != ")":
+                raise SegmentExpressionError("Missing closing parenthesis")
+            self._next()
+            return node
+
+        if kind == "tag":
+            return ("tag", self._next()[1])
+
+        raise SegmentExpressionError(f"Unexpected token '{self.tokens[self.position][1]}'")
+
+
+def parse_expression(expression: str) -> tuple:
+    """
+    Parse a boolean tag expression such as ``vip AND NOT churned``
+
+    Returns:
+        Parse tree of ("tag", name), ("not", node), ("and", [nodes]) or ("or", [nodes])
+    """
+    return _Parser(_tokenize(expression)).parse()
+
+
+def build_query(node: tuple) -> Dict:
+    """Translate a parse tree into a MongoDB filter on the ``tags`` array"""
+    kind = node[0]
+
+    if kind == "tag":
+        return {"tags": node[1]}
+
+    if kind == "not":
+        child = node[1]
+        if child[0] == "tag":
+            return {"tags": {"$ne": child[1]}}
+        return {"$nor": [build_query(child)]}
+
+    if kind == "and":
+        return {"$and": [build_query(child) for child in node[1]]}
+
+    return {"$or": [build_query(child) for child in node[1]]}
+
+
+def matches(node: tuple, tags: Iterable[str]) -> bool:
+    """Evaluate a parse tree against a contact's tags in memory"""
+    tag_set = tags if isinstance(tags, (set, frozenset)) else set(tags or [])
+    kind = node[0]
+
+    if kind == "tag":
+        return node[1] in tag_set
+    if kind == "not":
+        return not matches(node[1], tag_set)
+    if kind == "and":
+        return all(matches(child, tag_set) for child in node[1])
+    return any(matches(child, tag_set) for child in node[1])
+
+
+def segment_filter(user_id: str, expression: str) -> Dict:
+    """MongoDB filter selecting a user's contacts that match an expression"""
+    return {"user_id": user_id, **build_query(parse_expression(expression))}
+
+
+async def count_segment(db, user_id: str, expression: str) -> int:
+    """Count matching contacts with the (user_id, tags) index"""
+    return await db.contacts.count_documents(segment_filter(user_id, expression))
+
+
+async def stream_segment_contacts(
+    db,
+    user_id: str,
+    expression: str,
+    batch_size: int = 500
+) -> AsyncIterator[Dict]:
+    """
+    Stream contacts matching a segment straight from a cursor
+
+    Only the fields needed for messaging are projected, so memory stays
+    flat regardless of segment size.
+    """
+    cursor = db.contacts.find(
+        segment_filter(user_id, expression),
+        {"_id": 1, "name": 1, "phone": 1}
+    ).batch_size(batch_size)
+
+    async for contact in cursor:
+        yield contact
+
+
+async def apply_tag_changes(
+    db,
+    user_id: str,
+    changes: List[Tuple[Optional[Iterable[str]], Optional[Iterable[str]]]]
+):
+    """
+    Incrementally maintain segment counts after contacts' tags change
+
+    Each change is an ``(old_tags, new_tags)`` pair; use ``None`` as the old
+    tags of a newly created contact and as the new tags of a deleted one.
+    Deltas are summed per segment so a whole batch costs one ``$inc`` per
+    affected segment; nothing is recounted.
+    """
+    if not changes:
+        return
+
+    segments = await db.segments.find(
+        {"user_id": user_id},
+        {"_id": 1, "expression": 1}
+    ).to_list(length=None)
+
+    for segment in segments:
+        try:
+            node = parse_expression(segment["expression"])
+        except SegmentExpressionError:
+            logger.warning(f"Skipping segment {segment['_id']} with invalid expression")
+            continue
+
+        delta = 0
+        for old_tags, new_tags in changes:
+            was_member = old_tags is not None and matches(node, set(old_tags))
+            is_member = new_tags is not None and matches(node, set(new_tags))
+            delta += int(is_member) - int(was_member)
+
+        if delta:
+            await db.segments.update_one(
+                {"_id": segment["_id"]},
+                {"$inc": {"contact_count": delta}}
+            )
+
+
+async def apply_tag_change(
+    db,
+    user_id: str,
+    old_tags: Optional[Iterable[str]],
+    new_tags: Optional[Iterable[str]]
+):
+    """Maintain segment counts for a single contact's tag change"""
+    await apply_tag_changes(db, user_id, [(old_tags, new_tags)])
@@ -1,18 +1,51 @@
 import gspread
 from google.oauth2.service_account import Credentials
 from config import settings
-from typing import List, Dict, Optional
+from utils.cache import SingleFlight, TTLCache
+from utils.executor import BoundedExecutor
+from services.sheet_source import SheetSource, parse_rows
+from services.local_sheet_service import LocalFileSheetSource, user_sheet_root
+from gspread.utils import rowcol_to_a1
+from typing import AsyncIterator, List, Dict, Optional
+from urllib.parse import urlparse
 import logging
 import os
 
 logger = logging.getLogger(__name__)
 
+# gspread is synchronous; every call goes through this pool so a slow
+# Sheets response never blocks the event loop
+sheets_executor = BoundedExecutor(
+    name="google_sheets",
+    max_workers=settings.sheets_max_workers,
+    max_queue=settings.sheets_max_queue,
+    timeout=settings.sheets_call_timeout_seconds
+)
 
-class GoogleSheetsService:
+# Parsed rows and tab names, keyed by spreadsheet id, tab and modified time
+sheet_data_cache = TTLCache(
+    name="sheet_data",
+    maxsize=settings.sheet_cache_size,
+    ttl=settings.sheet_cache_ttl_seconds
+)
+
+# Open spreadsheet handles with their modified time, trusted briefly
+spreadsheet_handles = TTLCache(
+    name="sheet_handles",
+    maxsize=settings.sheet_cache_size,
+    ttl=settings.sheet_version_check_seconds
+)
+
+
+class GoogleSheetsService(SheetSource):
     """Service for interacting with Google Sheets API"""
     
+    executor = sheets_executor
+    name = "Google Sheets"
+    
     def __init__(self):
         self.client = None
+        self._flights = SingleFlight()
         self._initialize_client()
     
     def _initialize_client(self):
@@ -41,6 +74,10 @@ class GoogleSheetsService:
     def parse_sheet_url(self, url: str) -> Optional[str]:
         """Extract spreadsheet ID from Google Sheets URL"""
         try:
+            # gsheet://{SPREADSHEET_ID}
+            if url.startswith('gsheet://'):
+                return url[len('gsheet://'):].split('/')[0] or None
+            
             # URL format: https://docs.google.com/spreadsheets/d/{SPREADSHEET_ID}/edit...
             if '/spreadsheets/d/' in url:
                 spreadsheet_id = url.split('/spreadsheets/d/')[1].split('/')[0]
@@ -50,64 +87,193 @@ class GoogleSheetsService:
             logger.error(f"Failed to parse sheet URL: {e}")
             return None
     
-    def get_sheet_data(
+    def spreadsheet_id(self, sheet_url: str) -> str:
+        """Spreadsheet ID from a URL, or the value itself if it is already an ID"""
+        return self.parse_sheet_url(sheet_url) or sheet_url
+    
+    async def _cached(self, cache: TTLCache, key: tuple, load):
+        """Serve ``key`` from ``cache``, collapsing concurrent misses into one load"""
+        value = cache.get(key)
+        if value is not None:
+            return value
+        
+        async def load_and_store():
+            loaded = await load()
+            cache.set(key, loaded)
+            return loaded
+        
+        return await self._flights.do(key, load_and_store)
+    
+    async def _open(self, spreadsheet_id: str) -> tuple:
+        """
+        Open a spreadsheet and read its modified time
+        
+        The handle is reused for a short window so validate, preview and
+        campaign creation in quick succession open the spreadsheet once.
+        """
+        return await self._cached(
+            spreadsheet_handles,
+            ("handle", spreadsheet_id),
+            lambda: self._run(self._open_spreadsheet, spreadsheet_id)
+        )
+    
+    async def get_sheet_names(self, sheet_url: str) -> List[str]:
+        """Get all sheet names without blocking the event loop"""
+        spreadsheet_id = self.spreadsheet_id(sheet_url)
+        spreadsheet, modified_time = await self._open(spreadsheet_id)
+        
+        return await self._cached(
+            sheet_data_cache,
+            ("names", spreadsheet_id, modified_time),
+            lambda: self._run(self._get_sheet_names, spreadsheet)
+        )
+    
+    async def iter_sheet_rows(
         self,
         sheet_url: str,
-        sheet_name: Optional[str] = None
-    ) -> List[Dict[str, str]]:
+        sheet_name: Optional[str] = None,
+        batch_rows: Optional[int] = None
+    ) -> AsyncIterator[List[Dict[str, str]]]:
         """
-        Get data from Google Sheet
+        Stream a sheet as batches of row dicts
         
-        Args:
-            sheet_url: URL of the Google Sheet
-            sheet_name: Name of the specific sheet/tab (optional, defaults to first sheet)
+        The header row is read once, then the sheet is fetched in A1 ranges
+        of ``batch_rows`` rows, so memory stays flat however large the sheet
+        is. Rows are parsed like ``get_all_records``. Sheets of up to
+        ``sheet_cache_max_rows`` rows are read once per (spreadsheet, tab,
+        modified time), cached and served from memory, with concurrent
+        readers sharing the one download.
+        """
+        batch_rows = batch_rows or settings.sheet_read_batch_rows
+        spreadsheet_id = self.spreadsheet_id(sheet_url)
+        spreadsheet, modified_time = await self._open(spreadsheet_id)
+        key = ("rows", spreadsheet_id, sheet_name or "", modified_time)
+        
+        records = sheet_data_cache.get(key)
+        if records is None:
+            worksheet, header = await self._run(self._open_worksheet, spreadsheet, sheet_name)
+            
+            if worksheet.row_count - 1 > settings.sheet_cache_max_rows:
+                async for batch in self._stream(worksheet, header, batch_rows):
+                    yield batch
+                return
+            
+            records = await self._cached(
+                sheet_data_cache,
+                key,
+                lambda: self._read_all(worksheet, header)
+            )
+        
+        for start in range(0, len(records), batch_rows):
+            yield records[start:start + batch_rows]
+    
+    async def _read_all(self, worksheet, header: List[str]) -> List[Dict[str, str]]:
+        """Every record of an open tab, read in A1 ranges"""
+        records = []
+        async for batch in self._stream(worksheet, header):
+            records.extend(batch)
+        return records
+    
+    async def _stream(self, worksheet, header: List[str], batch_rows: Optional[int] = None):
+        """Read an open tab in A1 ranges of ``batch_rows`` rows"""
+        if not header:
+            return
+        
+        batch_rows = batch_rows or settings.sheet_read_batch_rows
+        
+        # The grid size bounds the scan; blank rows inside it are skipped
+        last_row = worksheet.row_count
+        start = 2
+        while start <= last_row:
+            end = min(start + batch_rows - 1, last_row)
+            values = await self._run(self._read_rows, worksheet, start, end, len(header))
+            batch = parse_rows(header, values)
+            if batch:
+                yield batch
+            start = end + 1
+    
+    async def preview_sheet(
+        self,
+        sheet_url: str,
+        sheet_name: Optional[str] = None,
+        rows: int = 10
+    ) -> tuple:
+        """
+        First ``rows`` data rows of a sheet, without downloading the rest
         
         Returns:
-            List of dictionaries with column headers as keys
+            (rows, total_rows); total_rows is only known (not None) when
+            the sheet is already cached
         """
+        spreadsheet_id = self.spreadsheet_id(sheet_url)
+        spreadsheet, modified_time = await self._open(spreadsheet_id)
+        
+        cached = sheet_data_cache.get(("rows", spreadsheet_id, sheet_name or "", modified_time))
+        if cached is not None:
+            return cached[:rows], len(cached)
+        
+        worksheet, header = await self._run(self._open_worksheet, spreadsheet, sheet_name)
+        if not header:
+            return [], 0
+        
+        values = await self._run(self._read_rows, worksheet, 2, rows + 1, len(header))
+        return parse_rows(header, values), None
+    
+    def _open_spreadsheet(self, spreadsheet_id: str) -> tuple:
+        """Open a spreadsheet; returns (spreadsheet, modified time)"""
         if not self.client:
             raise Exception("Google Sheets client not initialized. Please provide service account credentials.")
         
         try:
-            # Parse spreadsheet ID from URL
-            spreadsheet_id = self.parse_sheet_url(sheet_url)
-            if not spreadsheet_id:
-                # If parsing failed, assume the URL itself is the ID
-                spreadsheet_id = sheet_url
-            
-            # Open spreadsheet
             spreadsheet = self.client.open_by_key(spreadsheet_id)
-            
-            # Get worksheet
+        except gspread.exceptions.APIError as e:
+            logger.error(f"Google Sheets API error: {e}")
+            raise Exception("Failed to access Google Sheet. Make sure it's shared with the service account.")
+        except Exception as e:
+            logger.error(f"Error opening sheet: {e}")
+            raise Exception(f"Failed to fetch data from Google Sheet: {str(e)}")
+        
+        try:
+            modified_time = spreadsheet.lastUpdateTime
+        except Exception as e:
+            # Without a modified time entries simply live until their TTL
+            logger.warning(f"Could not read modified time of sheet {spreadsheet_id}: {e}")
+            modified_time = None
+        
+        return spreadsheet, modified_time
+    
+    def _open_worksheet(self, spreadsheet, sheet_name: Optional[str] = None) -> tuple:
+        """Open a tab and read its header row; returns (worksheet, header)"""
+        try:
             if sheet_name:
                 worksheet = spreadsheet.worksheet(sheet_name)
             else:
                 worksheet = spreadsheet.get_worksheet(0)  # First sheet
             
-            # Get all records as list of dictionaries
-            records = worksheet.get_all_records()
-            
-            logger.info(f"Successfully fetched {len(records)} records from sheet")
-            return records
+            return worksheet, worksheet.row_values(1)
             
         except gspread.exceptions.APIError as e:
             logger.error(f"Google Sheets API error: {e}")
-            raise Exception(f"Failed to access Google Sheet. Make sure it's shared with the service account.")
+            raise Exception("Failed to access Google Sheet. Make sure it's shared with the service account.")
         except Exception as e:
-            logger.error(f"Error fetching sheet data: {e}")
+            logger.error(f"Error opening worksheet: {e}")
             raise Exception(f"Failed to fetch data from Google Sheet: {str(e)}")
     
-    def get_sheet_names(self, sheet_url: str) -> List[str]:
-        """Get all sheet names from a spreadsheet"""
-        if not self.client:
-            raise Exception("Google Sheets client not initialized")
-        
+    def _read_rows(self, worksheet, start: int, end: int, width: int) -> List[List[str]]:
+        """Read rows ``start``..``end`` of the first ``width`` columns"""
         try:
-            spreadsheet_id = self.parse_sheet_url(sheet_url)
-            if not spreadsheet_id:
-                spreadsheet_id = sheet_url
+            return worksheet.get(f"{rowcol_to_a1(start, 1)}:{rowcol_to_a1(end, width)}")
             
-            spreadsheet = self.client.open_by_key(spreadsheet_id)
+        except gspread.exceptions.APIError as e:
+            logger.error(f"Google Sheets API error: {e}")
+            raise Exception("Failed to access Google Sheet. Make sure it's shared with the service account.")
+        except Exception as e:
+            logger.error(f"Error fetching sheet rows: {e}")
+            raise Exception(f"Failed to fetch data from Google Sheet: {str(e)}")
+    
+    def _get_sheet_names(self, spreadsheet) -> List[str]:
+        """Get all sheet names from an open spreadsheet"""
+        try:
             worksheets = spreadsheet.worksheets()
             
             return [ws.title for ws in worksheets]
@@ -119,3 +285,16 @@ class GoogleSheetsService:
 
 # Singleton instance
 sheets_service = GoogleSheetsService()
+
+
+def get_sheet_source(sheet_url: str, user_id: str) -> SheetSource:
+    """
+    Pick the source for a sheet URL by its scheme
+    
+    ``file:///<path>`` reads a CSV/XLSX/Parquet file from the user's local
+    sheet directory; ``gsheet://<id>``, Google Sheets URLs and bare
+    spreadsheet IDs go to Google Sheets.
+    """
+    if urlparse(sheet_url).scheme == "file":
+        return LocalFileSheetSource(user_sheet_root(user_id))
+    return sheets_service
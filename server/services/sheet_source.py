@@ -0,0 +1,76 @@
+from gspread.utils import numericise_all
+from utils.executor import BoundedExecutor, ExecutorSaturated
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+import asyncio
+
+
+def parse_rows(header: List[str], values: List[list]) -> List[Dict[str, str]]:
+    """
+    Turn raw row values into record dicts keyed by the header
+
+    Values are numericised the way gspread's ``get_all_records`` does, so
+    every source yields identical records for identical data. Blank rows
+    are skipped.
+    """
+    return [
+        dict(zip(header, numericise_all(
+            ["" if cell is None else str(cell) for cell in row] + [""] * (len(header) - len(row)),
+            default_blank=""
+        )))
+        for row in values
+        if any(cell not in ("", None) for cell in row)
+    ]
+
+
+class SheetSource:
+    """
+    Interface for anything contacts can be imported from
+
+    Implementations read a location (URL) as tabs of records. Blocking I/O
+    runs on the source's bounded ``executor``.
+    """
+
+    executor: BoundedExecutor
+    name: str = "sheet"
+
+    async def _run(self, fn, *args):
+        """Run a blocking call on this source's executor"""
+        try:
+            return await self.executor.run(fn, *args)
+        except ExecutorSaturated:
+            raise Exception(f"The {self.name} source is busy. Please try again shortly.")
+        except asyncio.TimeoutError:
+            raise Exception(f"Timed out reading from the {self.name} source. Please try again.")
+
+    async def get_sheet_names(self, sheet_url: str) -> List[str]:
+        """Names of the tabs at ``sheet_url``"""
+        raise NotImplementedError
+
+    def iter_sheet_rows(
+        self,
+        sheet_url: str,
+        sheet_name: Optional[str] = None,
+        batch_rows: Optional[int] = None
+    ) -> AsyncIterator[List[Dict[str, str]]]:
+        """Stream a tab as batches of record dicts"""
+        raise NotImplementedError
+
+    async def preview_sheet(
+        self,
+        sheet_url: str,
+        sheet_name: Optional[str] = None,
+        rows: int = 10
+    ) -> Tuple[List[Dict[str, str]], Optional[int]]:
+        """First ``rows`` records of a tab and its total row count (None if unknown)"""
+        raise NotImplementedError
+
+    async def get_sheet_data(
+        self,
+        sheet_url: str,
+        sheet_name: Optional[str] = None
+    ) -> List[Dict[str, str]]:
+        """Every record of a tab as one list; prefer iter_sheet_rows for large inputs"""
+        records = []
+        async for batch in self.iter_sheet_rows(sheet_url, sheet_name):
+            records.extend(batch)
+        return records
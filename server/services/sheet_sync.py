@@ -0,0 +1,226 @@
+import asyncio
+from database import get_database
+from config import settings
+from models.contact import ContactSource
+from services.segment_service import apply_tag_changes
+from services.sheet_service import get_sheet_source
+from pymongo import InsertOne, UpdateOne
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+import hashlib
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def row_name(row: Dict) -> Optional[str]:
+    """Name given in a sheet row, if any"""
+    return row.get('Name') or row.get('name') or row.get('Customer Name') or None
+
+
+def contact_fields(row: Dict) -> Tuple[str, Optional[str]]:
+    """Name and phone of a sheet row (handles different column names)"""
+    name = row_name(row) or 'Unknown'
+    phone = row.get('Phone') or row.get('phone') or row.get('Mobile') or row.get('Number')
+    return name, phone
+
+
+def row_hash(row: Dict) -> str:
+    """Stable content hash of a parsed sheet row"""
+    payload = json.dumps(row, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+async def upsert_sheet_contacts(db, user_id: str, rows: List[Dict], tags: List[str]) -> Tuple[int, int]:
+    """
+    Create or refresh the contacts behind a batch of sheet rows
+
+    Existing contacts are found with one ``$in`` query and only written if
+    their name or tags actually change; a row without a name never
+    overwrites an existing contact's name. Segment counts are kept in step.
+
+    Returns:
+        (contacts created, contacts updated)
+    """
+    names: Dict = {}
+    for row in rows:
+        _, phone = contact_fields(row)
+        if phone:
+            names[phone] = row_name(row)
+
+    if not names:
+        return 0, 0
+
+    existing = await db.contacts.find(
+        {"user_id": user_id, "phone": {"$in": list(names)}},
+        {"phone": 1, "name": 1, "tags": 1}
+    ).to_list(length=None)
+    by_phone = {contact["phone"]: contact for contact in existing}
+
+    now = datetime.utcnow()
+    ops = []
+    tag_changes = []
+    created = 0
+
+    for phone, name in names.items():
+        contact = by_phone.get(phone)
+
+        if contact is None:
+            ops.append(InsertOne({
+                "user_id": user_id,
+                "name": name or 'Unknown',
+                "phone": phone,
+                "tags": list(tags),
+                "source": ContactSource.SHEET,
+                "created_at": now
+            }))
+            tag_changes.append((None, list(tags)))
+            created += 1
+            continue
+
+        old_tags = contact.get("tags") or []
+        new_tags = old_tags + [tag for tag in tags if tag not in old_tags]
+        name = name or contact.get("name")
+        if name == contact.get("name") and new_tags == old_tags:
+            continue
+
+        ops.append(UpdateOne(
+            {"_id": contact["_id"]},
+            {"$set": {"name": name, "tags": new_tags, "updated_at": now}}
+        ))
+        if new_tags != old_tags:
+            tag_changes.append((old_tags, new_tags))
+
+    if ops:
+        await db.contacts.bulk_write(ops, ordered=False)
+        await apply_tag_changes(db, user_id, tag_changes)
+
+    return created, len(ops) - created
+
+
+async def sync_sheet(db, sync: dict) -> dict:
+    """
+    Bring contacts up to date with a sheet, touching only rows that changed
+
+    Every row's content hash is stored per (sync, row position). Rows below
+    the ``synced_rows`` watermark are compared with their stored hash and
+    skipped when equal; rows past it are new. Only new or changed rows
+    reach the contacts collection. Hashes past the end of a shrunken sheet
+    are dropped.
+    """
+    sync_id = str(sync["_id"])
+    watermark = sync.get("synced_rows", 0)
+    source = get_sheet_source(sync["sheet_url"], sync["user_id"])
+    result = {
+        "rows_scanned": 0, "rows_new": 0, "rows_changed": 0, "rows_unchanged": 0,
+        "contacts_created": 0, "contacts_updated": 0
+    }
+
+    position = 0
+    async for batch in source.iter_sheet_rows(sync["sheet_url"], sync.get("sheet_name")):
+        first = position
+        position += len(batch)
+        result["rows_scanned"] += len(batch)
+
+        stored = {}
+        if first < watermark:
+            docs = await db.sheet_sync_rows.find(
+                {"sync_id": sync_id, "row": {"$gte": first, "$lt": min(position, watermark)}},
+                {"row": 1, "hash": 1}
+            ).to_list(length=None)
+            stored = {doc["row"]: doc["hash"] for doc in docs}
+
+        changed = []
+        for index, row in enumerate(batch, start=first):
+            digest = row_hash(row)
+            previous = stored.get(index)
+
+            if previous == digest:
+                result["rows_unchanged"] += 1
+                continue
+
+            result["rows_changed" if previous is not None else "rows_new"] += 1
+            changed.append((index, row, digest))
+
+        if not changed:
+            continue
+
+        created, updated = await upsert_sheet_contacts(
+            db, sync["user_id"], [row for _, row, _ in changed], sync.get("tags", [])
+        )
+        result["contacts_created"] += created
+        result["contacts_updated"] += updated
+
+        # Hashes are recorded only after the contacts are written
+        await db.sheet_sync_rows.bulk_write([
+            UpdateOne(
+                {"sync_id": sync_id, "row": index},
+                {"$set": {"hash": digest}},
+                upsert=True
+            )
+            for index, _, digest in changed
+        ], ordered=False)
+
+    if position < watermark:
+        await db.sheet_sync_rows.delete_many({"sync_id": sync_id, "row": {"$gte": position}})
+
+    now = datetime.utcnow()
+    update = {
+        "synced_rows": position,
+        "last_synced_at": now,
+        "last_result": result,
+        "last_error": None,
+        "sync_lease_until": None
+    }
+    if sync.get("interval_minutes"):
+        update["next_run_at"] = now + timedelta(minutes=sync["interval_minutes"])
+
+    await db.sheet_syncs.update_one({"_id": sync["_id"]}, {"$set": update})
+
+    logger.info(f"Synced sheet {sync_id}: {result}")
+    return result
+
+
+async def _claim_due_sync(db):
+    """Lease one scheduled sync whose next run is due"""
+    now = datetime.utcnow()
+    return await db.sheet_syncs.find_one_and_update(
+        {
+            "next_run_at": {"$lte": now},
+            "$or": [
+                {"sync_lease_until": None},
+                {"sync_lease_until": {"$lt": now}}
+            ]
+        },
+        {"$set": {"sync_lease_until": now + timedelta(seconds=settings.sheet_sync_lease_seconds)}},
+        sort=[("next_run_at", 1)]
+    )
+
+
+async def run_sheet_syncer():
+    """Run scheduled sheet syncs as they fall due"""
+    while True:
+        try:
+            db = get_database()
+            sync = await _claim_due_sync(db)
+            while sync:
+                try:
+                    await sync_sheet(db, sync)
+                except Exception as e:
+                    logger.error(f"Sheet sync {sync['_id']} failed: {e}")
+                    await db.sheet_syncs.update_one(
+                        {"_id": sync["_id"]},
+                        {"$set": {
+                            "last_error": str(e),
+                            "sync_lease_until": None,
+                            "next_run_at": datetime.utcnow() + timedelta(minutes=sync["interval_minutes"])
+                        }}
+                    )
+                sync = await _claim_due_sync(db)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Error running scheduled sheet syncs: {e}")
+
+        await asyncio.sleep(settings.sheet_sync_poll_seconds)
@@ -1,6 +1,7 @@
 import asyncio
 from database import get_database
 from models.message import MessageStatus
+from services.campaign_recipients import iter_recipient_batches
 from bson import ObjectId
 from datetime import datetime
 import logging
@@ -26,8 +27,7 @@ async def simulate_campaign_delivery(campaign_id: str):
             logger.error(f"Campaign {campaign_id} not found")
             return
         
-        message_ids = campaign.get("message_ids", [])
-        total_messages = len(message_ids)
+        total_messages = campaign.get("total_contacts", 0)
         
         if total_messages == 0:
             logger.warning(f"No messages in campaign {campaign_id}")
@@ -37,23 +37,24 @@ async def simulate_campaign_delivery(campaign_id: str):
         
         # Phase 1: Gradually mark messages as DELIVERED (over 10-30 seconds)
         delivered_count = 0
-        for i, message_id in enumerate(message_ids):
-            # Wait 0.5-2 seconds between each update
-            await asyncio.sleep(random.uniform(0.5, 2))
-            
-            # Update message status to delivered
-            await db.messages.update_one(
-                {"_id": ObjectId(message_id)},
-                {"$set": {"status": MessageStatus.DELIVERED}}
-            )
-            
-            delivered_count += 1
-            
-            # Update campaign stats
-            await db.campaigns.update_one(
-                {"_id": ObjectId(campaign_id)},
-                {"$set": {"delivered_count": delivered_count}}
-            )
+        async for batch in iter_recipient_batches(db, campaign):
+            for recipient in batch:
+                # Wait 0.5-2 seconds between each update
+                await asyncio.sleep(random.uniform(0.5, 2))
+                
+                # Update message status to delivered
+                await db.messages.update_one(
+                    {"_id": recipient["message_id"]},
+                    {"$set": {"status": MessageStatus.DELIVERED}}
+                )
+                
+                delivered_count += 1
+                
+                # Update campaign stats
+                await db.campaigns.update_one(
+                    {"_id": ObjectId(campaign_id)},
+                    {"$set": {"delivered_count": delivered_count}}
+                )
         
         logger.info(f"All messages marked as delivered for campaign {campaign_id}")
         
@@ -63,28 +64,28 @@ async def simulate_campaign_delivery(campaign_id: str):
         # Phase 2: Gradually mark some messages as READ (simulate realistic open rates)
         # Not all messages will be read - simulate ~60-70% read rate
         read_count = 0
-        read_target = int(total_messages * random.uniform(0.6, 0.7))
+        read_target = int(delivered_count * random.uniform(0.6, 0.7))
         
-        for i in range(read_target):
-            # Wait 1-3 seconds between each update
-            await asyncio.sleep(random.uniform(1, 3))
-            
-            # Pick a random message that's not already read
-            message_id = message_ids[i]
-            
-            # Update message status to read
-            await db.messages.update_one(
-                {"_id": ObjectId(message_id)},
-                {"$set": {"status": MessageStatus.READ}}
-            )
-            
-            read_count += 1
-            
-            # Update campaign stats
-            await db.campaigns.update_one(
-                {"_id": ObjectId(campaign_id)},
-                {"$set": {"read_count": read_count}}
-            )
+        async for batch in iter_recipient_batches(db, campaign):
+            for recipient in batch[:read_target - read_count]:
+                # Wait 1-3 seconds between each update
+                await asyncio.sleep(random.uniform(1, 3))
+                
+                # Update message status to read
+                await db.messages.update_one(
+                    {"_id": recipient["message_id"]},
+                    {"$set": {"status": MessageStatus.READ}}
+                )
+                
+                read_count += 1
+                
+                # Update campaign stats
+                await db.campaigns.update_one(
+                    {"_id": ObjectId(campaign_id)},
+                    {"$set": {"read_count": read_count}}
+                )
+            if read_count >= read_target:
+                break
         
         # Mark campaign as completed
         await db.campaigns.update_one(
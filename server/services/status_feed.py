@@ -0,0 +1,106 @@
+from config import settings
+from services.cache_bus import cache_bus
+from utils.cache import TTLCache
+from datetime import datetime
+from typing import Dict, List
+
+# viewer_id -> grouped feed; dropped whenever one of the viewer's contacts posts
+status_feed_cache = TTLCache(
+    name="status_feed",
+    maxsize=settings.status_feed_cache_size,
+    ttl=settings.status_feed_cache_ttl_seconds
+)
+
+FEED_CHANNEL = "status_feed"
+
+# Viewer ids per bus message; keeps invalidation documents small
+_INVALIDATION_CHUNK = 5000
+
+
+def _on_invalidate(key: str):
+    for viewer_id in key.split(","):
+        status_feed_cache.pop(viewer_id)
+
+
+cache_bus.subscribe(FEED_CHANNEL, _on_invalidate)
+
+
+async def feed_authors(db, viewer_id: str) -> List[str]:
+    """The viewer plus every contact they haven't blocked"""
+    relationships = await db.contact_relationships.find(
+        {"user_id": viewer_id, "is_blocked": {"$ne": True}},
+        {"contact_user_id": 1}
+    ).to_list(length=None)
+    
+    return [viewer_id] + [r["contact_user_id"] for r in relationships]
+
+
+async def build_feed(db, viewer_id: str, statuses_per_author: int = 30) -> List[Dict]:
+    """
+    Live statuses from the viewer's contacts, grouped per author
+    
+    Each group lists its statuses oldest first with a ``viewed`` flag.
+    Authors with unseen statuses come first, then by latest post.
+    """
+    now = datetime.utcnow()
+    authors = await feed_authors(db, viewer_id)
+    
+    # Served by the (user_id, expires_at) index
+    statuses = await db.status_updates.find(
+        {"user_id": {"$in": authors}, "expires_at": {"$gt": now}},
+        {"viewers": 0}
+    ).sort("created_at", 1).to_list(length=None)
+    
+    views = await db.status_views.find(
+        {"status_id": {"$in": [str(s["_id"]) for s in statuses]}, "viewer_id": viewer_id},
+        {"status_id": 1}
+    ).to_list(length=None)
+    viewed_ids = {v["status_id"] for v in views}
+    
+    groups: Dict[str, Dict] = {}
+    for status_doc in statuses:
+        status_doc["viewed"] = str(status_doc["_id"]) in viewed_ids
+        group = groups.setdefault(status_doc["user_id"], {
+            "user_id": status_doc["user_id"],
+            "contact_name": status_doc.get("contact_name", ""),
+            "contact_phone": status_doc.get("contact_phone", ""),
+            "has_unseen": False,
+            "latest_at": status_doc["created_at"],
+            "statuses": []
+        })
+        group["statuses"].append(status_doc)
+        group["has_unseen"] = group["has_unseen"] or not status_doc["viewed"]
+        group["latest_at"] = max(group["latest_at"], status_doc["created_at"])
+    
+    for group in groups.values():
+        group["statuses"] = group["statuses"][-statuses_per_author:]
+    
+    return sorted(
+        groups.values(),
+        key=lambda g: (not g["has_unseen"], -g["latest_at"].timestamp())
+    )
+
+
+async def get_feed(db, viewer_id: str) -> List[Dict]:
+    """Grouped feed for a viewer, from the short-TTL cache when warm"""
+    feed = status_feed_cache.get(viewer_id)
+    if feed is None:
+        feed = await build_feed(db, viewer_id)
+        status_feed_cache.set(viewer_id, feed)
+    return feed
+
+
+async def invalidate_viewers(viewer_ids: List[str]):
+    """Drop cached feeds here and on every other worker"""
+    for start in range(0, len(viewer_ids), _INVALIDATION_CHUNK):
+        await cache_bus.publish(FEED_CHANNEL, ",".join(viewer_ids[start:start + _INVALIDATION_CHUNK]))
+
+
+async def invalidate_author(db, author_id: str):
+    """Drop the feeds of everyone who sees ``author_id``'s statuses"""
+    relationships = await db.contact_relationships.find(
+        {"contact_user_id": author_id},
+        {"user_id": 1}
+    ).to_list(length=None)
+    
+    await invalidate_viewers([author_id] + [r["user_id"] for r in relationships])
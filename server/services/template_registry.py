@@ -0,0 +1,82 @@
+from config import settings
+from models.template import DEMO_TEMPLATES
+from services.cache_bus import cache_bus
+from utils.cache import TTLCache
+from typing import Dict, List, Optional
+import threading
+
+# Demo templates are static, so they are indexed once at import
+DEMO_INDEX: Dict[str, dict] = {t["_id"]: t for t in DEMO_TEMPLATES}
+
+# user_id -> {template_id: template} of that user's custom templates
+template_cache = TTLCache(
+    name="templates",
+    maxsize=settings.template_cache_size,
+    ttl=settings.template_cache_ttl_seconds
+)
+
+TEMPLATE_CHANNEL = "templates"
+
+# Per-user version stamps, bumped on every invalidation. A load only fills
+# the cache if no write happened while it was reading from Mongo. Stamps
+# only need to outlive a load, so they share the template cache's bounds.
+template_versions = TTLCache(
+    name="template_versions",
+    maxsize=settings.template_cache_size,
+    ttl=settings.template_cache_ttl_seconds
+)
+_versions_lock = threading.Lock()
+
+
+def _bump(user_id: str):
+    with _versions_lock:
+        template_versions.set(user_id, template_versions.get(user_id, 0) + 1)
+    template_cache.pop(user_id)
+
+
+cache_bus.subscribe(TEMPLATE_CHANNEL, _bump)
+
+
+async def _custom_templates(db, user_id: str) -> Dict[str, dict]:
+    templates = template_cache.get(user_id)
+    if templates is not None:
+        return templates
+    
+    version = template_versions.get(user_id, 0)
+    
+    docs = await db.templates.find({"user_id": user_id}).sort("created_at", 1).to_list(length=None)
+    templates = {}
+    for doc in docs:
+        doc["_id"] = str(doc["_id"])
+        templates[doc["_id"]] = doc
+    
+    if template_versions.get(user_id, 0) == version:
+        template_cache.set(user_id, templates)
+    
+    return templates
+
+
+async def list_templates(db, user_id: str, limit: Optional[int] = None) -> List[dict]:
+    """Demo templates followed by (at most ``limit`` of) the user's custom templates"""
+    custom = await _custom_templates(db, user_id)
+    return DEMO_TEMPLATES + list(custom.values())[:limit]
+
+
+async def lookup_template(db, user_id: str, template_id: str) -> Optional[dict]:
+    """
+    Resolve a template id for a user in O(1)
+    
+    Demo templates are shared; custom templates only resolve for their
+    owner. Returns None if neither matches.
+    """
+    template = DEMO_INDEX.get(template_id)
+    if template is not None:
+        return template
+    
+    custom = await _custom_templates(db, user_id)
+    return custom.get(template_id)
+
+
+async def invalidate_user_templates(user_id: str):
+    """Bump the user's template version here and on every other worker"""
+    await cache_bus.publish(TEMPLATE_CHANNEL, user_id)
@@ -0,0 +1,135 @@
+from config import settings
+from services.cache_bus import cache_bus
+from utils.cache import SingleFlight
+from datetime import datetime, timedelta
+from typing import Dict
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+REVOCATION_CHANNEL = "token_revocations"
+
+# Incremental reloads re-read this far back to absorb clock skew and
+# inserts that commit late; applying an entry twice is harmless
+_RELOAD_OVERLAP = timedelta(seconds=60)
+
+
+class TokenDenylist:
+    """
+    In-memory view of revoked access tokens
+
+    Two kinds of revocation are kept: single tokens by ``jti`` (logout)
+    and every token a user was issued before a point in time (forced
+    expiry). Checks are dictionary lookups, so no request pays for a
+    database round trip. Revocations are persisted in the TTL-indexed
+    ``token_revocations`` collection, loaded at startup and pushed to the
+    other workers over the cache bus. Every process also reloads new
+    revocations from Mongo at most every ``token_denylist_refresh_seconds``,
+    which covers processes without a bus (serverless functions) and any
+    bus message that never arrives. Entries are pruned once the tokens
+    they cover have expired anyway.
+    """
+
+    def __init__(self):
+        self._tokens: Dict[str, float] = {}  # jti -> token exp
+        self._users: Dict[str, float] = {}  # user_id -> revoked-before timestamp
+        self._lock = threading.Lock()
+        self._next_prune = 0.0
+        self._next_refresh = 0.0
+        self._failures = 0  # Consecutive failed reloads
+        self._loaded_at: datetime = None
+        self._flights = SingleFlight()
+
+    def _apply(self, key: str):
+        kind, subject, timestamp = key.split(":", 2)
+        with self._lock:
+            if kind == "token":
+                self._tokens[subject] = float(timestamp)
+            else:
+                self._users[subject] = max(self._users.get(subject, 0.0), float(timestamp))
+
+    def _prune(self, now: float):
+        lifetime = settings.access_token_expire_minutes * 60
+        with self._lock:
+            self._tokens = {jti: exp for jti, exp in self._tokens.items() if exp > now}
+            self._users = {uid: ts for uid, ts in self._users.items() if ts + lifetime > now}
+            self._next_prune = now + 60
+
+    def is_revoked(self, claims: dict) -> bool:
+        """Whether verified token claims have been revoked"""
+        now = time.time()
+        if now >= self._next_prune:
+            self._prune(now)
+
+        jti = claims.get("jti")
+        if jti and jti in self._tokens:
+            return True
+
+        revoked_before = self._users.get(claims.get("sub"))
+        if revoked_before is None:
+            return False
+
+        # Tokens issued before jti/iat existed can only be revoked wholesale
+        issued_at = claims.get("iat")
+        return issued_at is None or issued_at < revoked_before
+
+    async def load(self, db):
+        """Load unexpired revocations, e.g. at startup"""
+        await self._reload(db, since=None)
+        logger.info(f"Loaded {len(self._tokens)} revoked tokens and {len(self._users)} user revocations")
+
+    async def _reload(self, db, since: datetime = None):
+        started_at = datetime.utcnow()
+        query = {"expires_at": {"$gt": started_at}}
+        if since is not None:
+            query["created_at"] = {"$gte": since - _RELOAD_OVERLAP}
+
+        async for entry in db.token_revocations.find(query, {"key": 1}):
+            self._apply(entry["key"])
+        self._loaded_at = started_at
+
+    async def refresh(self, db):
+        """Pick up revocations written since the last (re)load"""
+        if time.monotonic() < self._next_refresh:
+            return
+
+        async def reload():
+            try:
+                await self._reload(db, since=self._loaded_at)
+                self._failures = 0
+            except Exception as e:
+                # Keep checking against the last loaded set and back off
+                self._failures += 1
+                logger.error(f"Failed to reload token revocations: {e}")
+            delay = settings.token_denylist_refresh_seconds * 2 ** min(self._failures, 6)
+            self._next_refresh = time.monotonic() + delay
+
+        # Concurrent requests wait for one reload rather than checking a stale list
+        await self._flights.do("reload", reload)
+
+    async def _publish(self, db, key: str, expires_at: datetime):
+        await db.token_revocations.insert_one({
+            "key": key,
+            "expires_at": expires_at,
+            "created_at": datetime.utcnow()
+        })
+        await cache_bus.publish(REVOCATION_CHANNEL, key)
+
+    async def revoke_token(self, db, claims: dict):
+        """Revoke a single token (logout)"""
+        exp = float(claims.get("exp", time.time()))
+        await self._publish(db, f"token:{claims['jti']}:{exp}", datetime.utcfromtimestamp(exp))
+
+    async def revoke_user_tokens(self, db, user_id: str):
+        """Revoke every token issued to a user before the current second (forced expiry)"""
+        now = int(time.time())
+        expires_at = datetime.utcfromtimestamp(now) + timedelta(minutes=settings.access_token_expire_minutes)
+        await self._publish(db, f"user:{user_id}:{now}", expires_at)
+
+
+# Singleton instance
+token_denylist = TokenDenylist()
+
+cache_bus.subscribe(REVOCATION_CHANNEL, token_denylist._apply)
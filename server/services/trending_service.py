@@ -0,0 +1,65 @@
+import asyncio
+from database import get_database
+from config import settings
+from services import counter_service
+from services.channel_reaper import LIVE_CHANNEL
+from datetime import datetime
+from typing import List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Enough to serve the largest discovery page
+TRENDING_SIZE = 100
+
+
+class TrendingChannels:
+    """
+    Periodically refreshed snapshot of the most-followed channels
+    
+    The unfiltered discovery page is the same for every user, so it is
+    read from this in-memory list instead of sorting the channels
+    collection on each request.
+    """
+    
+    def __init__(self):
+        self.channels: List[dict] = []
+        self.refreshed_at: Optional[datetime] = None
+    
+    async def refresh(self, db):
+        """Rebuild the snapshot from the (followers_count desc) index"""
+        channels = await db.channels.find(LIVE_CHANNEL).sort(
+            "followers_count", -1
+        ).limit(TRENDING_SIZE).to_list(length=TRENDING_SIZE)
+        
+        for channel in channels:
+            channel["_id"] = str(channel["_id"])
+        await counter_service.apply_counts(db, "channels", channels)
+        
+        channels.sort(key=lambda c: c.get("followers_count", 0), reverse=True)
+        self.channels = channels
+        self.refreshed_at = datetime.utcnow()
+    
+    def discard(self, channel_id: str):
+        """Drop a channel from the snapshot, e.g. once it is deleted"""
+        self.channels = [channel for channel in self.channels if channel["_id"] != channel_id]
+    
+    def page(self, limit: int) -> Optional[List[dict]]:
+        """Copies of the top ``limit`` channels, or None before the first refresh"""
+        if self.refreshed_at is None:
+            return None
+        return [dict(channel) for channel in self.channels[:limit]]
+
+
+# Singleton instance
+trending_channels = TrendingChannels()
+
+
+async def run_trending_refresher():
+    """Keep the trending snapshot current"""
+    while True:
+        try:
+            await trending_channels.refresh(get_database())
+        except Exception as e:
+            logger.error(f"Error refreshing trending channels: {e}")
+        await asyncio.sleep(settings.trending_refresh_interval_seconds)
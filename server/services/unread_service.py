@@ -0,0 +1,113 @@
+from config import settings
+from services.counter_service import apply_counts
+from bson import ObjectId
+from datetime import datetime
+from typing import Dict, List
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Unread counts computed on read are capped (clients show "99+" style badges)
+UNREAD_COUNT_CAP = 1000
+
+_EPOCH = datetime(1970, 1, 1)
+_FAR_FUTURE = datetime(9999, 1, 1)
+
+
+async def fanout_group_message(db, group_id: str, sender_id: str, created_at: datetime):
+    """
+    Record a new group message against every member's unread state
+
+    Small groups get fan-out-on-write: one ``update_many`` bumps every
+    other member's ``unread_count``. Groups above
+    ``group_fanout_max_members`` are skipped and counted on read from the
+    members' read watermarks instead. The sender's watermark always
+    advances past their own message.
+    """
+    try:
+        group = await db.groups.find_one({"_id": ObjectId(group_id)}, {"members_count": 1})
+        if group:
+            group["_id"] = group_id
+            await apply_counts(db, "groups", [group])
+        if group and group.get("members_count", 0) <= settings.group_fanout_max_members:
+            await db.group_members.update_many(
+                {"group_id": group_id, "user_id": {"$ne": sender_id}},
+                {"$inc": {"unread_count": 1}}
+            )
+        
+        await db.group_members.update_one(
+            {"group_id": group_id, "user_id": sender_id},
+            {"$max": {"last_read_at": created_at}}
+        )
+    except Exception as e:
+        logger.error(f"Error fanning out group message for {group_id}: {e}")
+
+
+async def mark_group_read(db, group_id: str, user_id: str) -> bool:
+    """Move the member's read watermark to now and clear their counter"""
+    result = await db.group_members.update_one(
+        {"group_id": group_id, "user_id": user_id},
+        {"$set": {"last_read_at": datetime.utcnow(), "unread_count": 0}}
+    )
+    return result.matched_count > 0
+
+
+async def get_unread_counts(db, user_id: str) -> List[Dict]:
+    """
+    Unread counts for all of a user's groups in one aggregation
+
+    Fan-out groups read the maintained counter; large groups count
+    messages newer than the member's watermark through the
+    (group_id, created_at) index. For fan-out groups the lookup range
+    starts in the far future, so it touches no documents. Group sizes are
+    read through the sharded counters so both sides of the threshold agree
+    with ``fanout_group_message``.
+    """
+    threshold = settings.group_fanout_max_members
+    
+    memberships = await db.group_members.find({"user_id": user_id}, {"group_id": 1}).to_list(length=None)
+    groups = await db.groups.find(
+        {"_id": {"$in": [ObjectId(m["group_id"]) for m in memberships]}},
+        {"members_count": 1}
+    ).to_list(length=None)
+    for group in groups:
+        group["_id"] = str(group["_id"])
+    await apply_counts(db, "groups", groups)
+    
+    large_groups = [group["_id"] for group in groups if group.get("members_count", 0) > threshold]
+    
+    pipeline = [
+        {"$match": {"user_id": user_id, "group_id": {"$in": [group["_id"] for group in groups]}}},
+        {"$addFields": {
+            "computed_on_read": {"$in": ["$group_id", large_groups]},
+            "watermark": {"$ifNull": ["$last_read_at", {"$ifNull": ["$joined_at", _EPOCH]}]}
+        }},
+        {"$lookup": {
+            "from": "group_messages",
+            "let": {
+                "gid": "$group_id",
+                "since": {"$cond": ["$computed_on_read", "$watermark", _FAR_FUTURE]}
+            },
+            "pipeline": [
+                {"$match": {"$expr": {"$and": [
+                    {"$eq": ["$group_id", "$$gid"]},
+                    {"$gt": ["$created_at", "$$since"]}
+                ]}}},
+                {"$limit": UNREAD_COUNT_CAP},
+                {"$count": "count"}
+            ],
+            "as": "computed"
+        }},
+        {"$project": {
+            "_id": 0,
+            "group_id": 1,
+            "last_read_at": "$watermark",
+            "unread_count": {"$cond": [
+                "$computed_on_read",
+                {"$ifNull": [{"$arrayElemAt": ["$computed.count", 0]}, 0]},
+                {"$ifNull": ["$unread_count", 0]}
+            ]}
+        }}
+    ]
+    
+    return await db.group_members.aggregate(pipeline).to_list(length=None)
@@ -0,0 +1,158 @@
+import asyncio
+from database import get_database
+from config import settings
+from utils import hyperloglog
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from datetime import datetime
+from typing import Dict, List
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ViewBuffer:
+    """Pending views for one sketch document"""
+    
+    def __init__(self):
+        self.registers: Dict[int, int] = {}
+        self.views = 0
+
+
+class ChannelViewTracker:
+    """
+    Unique-viewer analytics for channel posts backed by HyperLogLog
+    
+    Views are folded into in-memory register maps and flushed
+    periodically as ``$max`` updates on each register, which merge
+    commutatively across workers. Each post and each (channel, day) keeps
+    at most 2048 registers however many followers view it. Batches that
+    fail to write are merged back and retried on the next flush. Where no
+    flusher runs (serverless), callers flush after each view instead.
+    """
+    
+    def __init__(self):
+        self._messages: Dict[str, ViewBuffer] = {}
+        self._message_channels: Dict[str, str] = {}
+        self._days: Dict[tuple, ViewBuffer] = {}
+        self.flusher_running = False
+    
+    def record(self, channel_id: str, message_id: str, user_id: str):
+        """Buffer one view; no I/O"""
+        index, rank = hyperloglog.register_update(user_id)
+        day = datetime.utcnow().strftime("%Y-%m-%d")
+        
+        self._message_channels[message_id] = channel_id
+        for buffer in (
+            self._messages.setdefault(message_id, ViewBuffer()),
+            self._days.setdefault((channel_id, day), ViewBuffer())
+        ):
+            if rank > buffer.registers.get(index, 0):
+                buffer.registers[index] = rank
+            buffer.views += 1
+    
+    @staticmethod
+    def _merge_back(pending: Dict, failed: Dict):
+        """Fold a batch that failed to write back into the live buffer"""
+        for key, buffer in failed.items():
+            target = pending.setdefault(key, ViewBuffer())
+            for index, rank in buffer.registers.items():
+                if rank > target.registers.get(index, 0):
+                    target.registers[index] = rank
+            target.views += buffer.views
+    
+    async def _write(self, collection, keys: List, ops: List[UpdateOne], batch: Dict, pending: Dict):
+        """bulk_write one collection's batch, returning unwritten entries to ``pending``"""
+        if not ops:
+            return
+        try:
+            await collection.bulk_write(ops, ordered=False)
+        except BulkWriteError as e:
+            failed = {keys[error["index"]] for error in e.details.get("writeErrors", [])}
+            self._merge_back(pending, {key: batch[key] for key in failed})
+            raise
+        except Exception:
+            self._merge_back(pending, batch)
+            raise
+    
+    @staticmethod
+    def _update(buffer: ViewBuffer, extra: dict) -> dict:
+        update = {"$inc": {"views": buffer.views}}
+        # Servers before 5.0 reject empty operator documents
+        if extra:
+            update["$setOnInsert"] = extra
+        if buffer.registers:
+            update["$max"] = {f"registers.{index}": rank for index, rank in buffer.registers.items()}
+        return update
+    
+    async def flush(self, db):
+        """Write buffered sketches with one bulk_write per collection"""
+        messages, self._messages = self._messages, {}
+        message_channels, self._message_channels = self._message_channels, {}
+        days, self._days = self._days, {}
+        
+        message_ops: List[UpdateOne] = [
+            UpdateOne(
+                {"_id": message_id},
+                self._update(buffer, {"channel_id": message_channels[message_id]}),
+                upsert=True
+            )
+            for message_id, buffer in messages.items()
+        ]
+        day_ops: List[UpdateOne] = [
+            UpdateOne(
+                {"channel_id": channel_id, "day": day},
+                self._update(buffer, {}),
+                upsert=True
+            )
+            for (channel_id, day), buffer in days.items()
+        ]
+        
+        error = None
+        for collection, batch, ops, pending in (
+            (db.channel_message_views, messages, message_ops, self._messages),
+            (db.channel_reach_daily, days, day_ops, self._days)
+        ):
+            try:
+                await self._write(collection, list(batch), ops, batch, pending)
+            except Exception as e:
+                error = error or e
+        
+        for message_id, channel_id in message_channels.items():
+            if message_id in self._messages:
+                self._message_channels.setdefault(message_id, channel_id)
+        
+        if error:
+            raise error
+    
+    async def flush_if_unattended(self, db):
+        """Flush right away when no background flusher is running (serverless)"""
+        if self.flusher_running:
+            return
+        try:
+            await self.flush(db)
+        except Exception as e:
+            # Kept in the buffer for the next view on this instance
+            logger.error(f"Error flushing channel views: {e}")
+
+
+# Singleton instance
+view_tracker = ChannelViewTracker()
+
+
+async def run_view_flusher():
+    """Flush buffered channel views periodically (and once more on shutdown)"""
+    view_tracker.flusher_running = True
+    try:
+        while True:
+            await asyncio.sleep(settings.view_flush_interval_seconds)
+            try:
+                await view_tracker.flush(get_database())
+            except Exception as e:
+                logger.error(f"Error flushing channel views: {e}")
+    finally:
+        view_tracker.flusher_running = False
+        try:
+            await view_tracker.flush(get_database())
+        except Exception as e:
+            logger.error(f"Error flushing channel views on shutdown: {e}")
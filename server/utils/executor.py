@@ -0,0 +1,149 @@
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
+import asyncio
+import threading
+import time
+
+# Every named executor registers itself here so its stats can be reported
+_registry: Dict[str, "BoundedExecutor"] = {}
+
+# Latency samples kept per executor for percentile reporting
+_SAMPLE_SIZE = 1024
+
+
+class ExecutorSaturated(RuntimeError):
+    """Raised when a call is rejected because the executor's queue is full"""
+    pass
+
+
+def percentile(samples: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of a list of samples (0.0 when empty)"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class BoundedExecutor:
+    """
+    Thread pool for blocking calls made from async handlers
+
+    At most ``max_workers`` calls run at once and at most ``max_queue`` more
+    wait for a thread; anything beyond that is rejected immediately with
+    ``ExecutorSaturated`` instead of piling up. Each call is awaited with a
+    timeout. A timed-out call keeps its thread until the blocking function
+    returns, so it still counts against the cap.
+    """
+
+    def __init__(self, name: str, max_workers: int, max_queue: int, timeout: float):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._running = 0
+        self._wait_samples = deque(maxlen=_SAMPLE_SIZE)
+        self._run_samples = deque(maxlen=_SAMPLE_SIZE)
+        self.completed = 0
+        self.failed = 0
+        self.timed_out = 0
+        self.rejected = 0
+        _registry[name] = self
+
+    def _call(self, submitted_at: float, fn: Callable, args: tuple, kwargs: dict) -> Any:
+        started_at = time.monotonic()
+        with self._lock:
+            self._running += 1
+            self._wait_samples.append(started_at - submitted_at)
+        try:
+            result = fn(*args, **kwargs)
+            with self._lock:
+                self.completed += 1
+            return result
+        except Exception:
+            with self._lock:
+                self.failed += 1
+            raise
+        finally:
+            with self._lock:
+                self._running -= 1
+                self._pending -= 1
+                self._run_samples.append(time.monotonic() - started_at)
+
+    def _release_if_cancelled(self, job):
+        # A call cancelled while still queued never reaches _call
+        if job.cancelled():
+            with self._lock:
+                self._pending -= 1
+
+    async def run(self, fn: Callable, *args, timeout: Optional[float] = None, **kwargs) -> Any:
+        """
+        Run ``fn(*args, **kwargs)`` on the pool without blocking the event loop
+
+        Raises:
+            ExecutorSaturated: the pool and its queue are full
+            asyncio.TimeoutError: the call did not finish within the timeout
+        """
+        with self._lock:
+            if self._pending >= self.max_workers + self.max_queue:
+                self.rejected += 1
+                raise ExecutorSaturated(f"{self.name} executor is saturated")
+            self._pending += 1
+
+        try:
+            job = self._pool.submit(self._call, time.monotonic(), fn, args, kwargs)
+        except Exception:
+            with self._lock:
+                self._pending -= 1
+            raise
+        job.add_done_callback(self._release_if_cancelled)
+
+        try:
+            return await asyncio.wait_for(
+                asyncio.wrap_future(job),
+                timeout=self.timeout if timeout is None else timeout
+            )
+        except asyncio.TimeoutError:
+            with self._lock:
+                self.timed_out += 1
+            raise
+
+    def shutdown(self):
+        """Stop accepting work; running calls are left to finish"""
+        self._pool.shutdown(wait=False)
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of queue depth, outcome counters and latency percentiles"""
+        with self._lock:
+            waits = list(self._wait_samples)
+            runs = list(self._run_samples)
+            pending = self._pending
+            running = self._running
+        return {
+            "name": self.name,
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "running": running,
+            "queued": max(0, pending - running),
+            "completed": self.completed,
+            "failed": self.failed,
+            "timed_out": self.timed_out,
+            "rejected": self.rejected,
+            "queue_wait_ms": {
+                "p50": round(percentile(waits, 0.5) * 1000, 2),
+                "p99": round(percentile(waits, 0.99) * 1000, 2)
+            },
+            "run_ms": {
+                "p50": round(percentile(runs, 0.5) * 1000, 2),
+                "p99": round(percentile(runs, 0.99) * 1000, 2)
+            }
+        }
+
+
+def executor_stats() -> List[Dict[str, Any]]:
+    """Stats for every registered executor"""
+    return [executor.stats() for executor in _registry.values()]
@@ -0,0 +1,54 @@
+from typing import Dict, Iterable, Mapping
+import hashlib
+import math
+
+# 2^11 registers: ~2.3% standard error, at most 2048 small ints per sketch
+PRECISION = 11
+REGISTER_COUNT = 1 << PRECISION
+_HASH_BITS = 64
+_ALPHA = 0.7213 / (1 + 1.079 / REGISTER_COUNT)
+
+
+def register_update(item: str) -> tuple:
+    """
+    Hash an item to its (register index, rank) pair
+    
+    The rank is the position of the first set bit in the hash bits left
+    after the index, as in the standard HyperLogLog construction.
+    """
+    value = int.from_bytes(hashlib.blake2b(item.encode(), digest_size=8).digest(), "big")
+    index = value >> (_HASH_BITS - PRECISION)
+    remainder = value & ((1 << (_HASH_BITS - PRECISION)) - 1)
+    rank = (_HASH_BITS - PRECISION) - remainder.bit_length() + 1
+    return index, rank
+
+
+def merge(sketches: Iterable[Mapping]) -> Dict[int, int]:
+    """Union of several sparse register maps (register-wise max)"""
+    merged: Dict[int, int] = {}
+    for registers in sketches:
+        for index, rank in registers.items():
+            index = int(index)
+            if rank > merged.get(index, 0):
+                merged[index] = rank
+    return merged
+
+
+def estimate(registers: Mapping) -> int:
+    """
+    Approximate number of distinct items added to a sparse register map
+    
+    Keys may be ints or the string keys MongoDB hands back. Uses linear
+    counting for small cardinalities.
+    """
+    if not registers:
+        return 0
+    
+    total = sum(2.0 ** -int(rank) for rank in registers.values())
+    zeros = REGISTER_COUNT - len(registers)
+    total += zeros
+    
+    raw = _ALPHA * REGISTER_COUNT * REGISTER_COUNT / total
+    if raw <= 2.5 * REGISTER_COUNT and zeros:
+        return int(round(REGISTER_COUNT * math.log(REGISTER_COUNT / zeros)))
+    return int(round(raw))
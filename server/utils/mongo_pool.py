@@ -0,0 +1,145 @@
+from pymongo import monitoring
+from collections import deque
+from typing import Any, Dict
+from utils.executor import percentile
+import threading
+import time
+
+# Connection pool settings per deployment shape, selected by
+# settings.mongodb_pool_profile
+POOL_PROFILES: Dict[str, Dict[str, Any]] = {
+    # Short-lived functions: few connections, released quickly
+    "serverless": {
+        "maxPoolSize": 10,
+        "minPoolSize": 1,
+        "maxIdleTimeMS": 10000,
+        "serverSelectionTimeoutMS": 5000,
+        "waitQueueTimeoutMS": 5000
+    },
+    # One long-running uvicorn process
+    "single-node": {
+        "maxPoolSize": 50,
+        "minPoolSize": 5,
+        "maxIdleTimeMS": 60000,
+        "serverSelectionTimeoutMS": 5000,
+        "waitQueueTimeoutMS": 10000
+    },
+    # Busy workers behind a load balancer
+    "high-concurrency": {
+        "maxPoolSize": 200,
+        "minPoolSize": 20,
+        "maxIdleTimeMS": 300000,
+        "maxConnecting": 8,
+        "serverSelectionTimeoutMS": 5000,
+        "waitQueueTimeoutMS": 15000
+    }
+}
+
+# Checkout wait samples kept for percentile reporting
+_SAMPLE_SIZE = 1024
+
+
+class PoolTelemetry(monitoring.ConnectionPoolListener):
+    """
+    Connection pool listener feeding /metrics
+
+    Tracks open and checked-out connections per server and how long
+    requests wait to check a connection out. pymongo checks connections
+    out synchronously on the calling thread, so the wait is measured
+    between the start and end events on that thread. A closed pool stays
+    listed until its last connection is checked in and closed; events for
+    servers without an entry are ignored.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._pools: Dict[str, Dict[str, Any]] = {}
+        self._waits = deque(maxlen=_SAMPLE_SIZE)
+
+    def _pool(self, address, create: bool = False) -> Dict[str, Any]:
+        key = f"{address[0]}:{address[1]}"
+        pool = self._pools.get(key)
+        if pool is None and create:
+            pool = self._pools[key] = {
+                "open": 0, "in_use": 0, "checkouts": 0,
+                "checkout_failures": 0, "cleared": 0, "closed": False
+            }
+        return pool if pool is not None else {}
+
+    def _bump(self, address, field: str, delta: int = 1):
+        with self._lock:
+            pool = self._pool(address)
+            if pool:
+                pool[field] += delta
+
+    def pool_created(self, event):
+        with self._lock:
+            self._pool(event.address, create=True)["closed"] = False
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self._bump(event.address, "cleared")
+
+    def pool_closed(self, event):
+        # Checked-out connections are returned and closed after this, so
+        # the entry is kept for their events
+        with self._lock:
+            pool = self._pool(event.address)
+            if pool:
+                pool["closed"] = True
+
+    def connection_created(self, event):
+        self._bump(event.address, "open")
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self._bump(event.address, "open", -1)
+
+    def connection_check_out_started(self, event):
+        self._local.started_at = time.monotonic()
+
+    def connection_check_out_failed(self, event):
+        self._bump(event.address, "checkout_failures")
+        self._local.started_at = None
+
+    def connection_checked_out(self, event):
+        started_at = getattr(self._local, "started_at", None)
+        self._local.started_at = None
+        with self._lock:
+            pool = self._pool(event.address)
+            if pool:
+                pool["in_use"] += 1
+                pool["checkouts"] += 1
+            if started_at is not None:
+                self._waits.append(time.monotonic() - started_at)
+
+    def connection_checked_in(self, event):
+        self._bump(event.address, "in_use", -1)
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-server connection counts and checkout wait percentiles"""
+        with self._lock:
+            waits = list(self._waits)
+            # Closed pools are reported until their last connection goes
+            self._pools = {
+                address: pool for address, pool in self._pools.items()
+                if not pool["closed"] or pool["open"] > 0 or pool["in_use"] > 0
+            }
+            pools = {address: dict(pool) for address, pool in self._pools.items()}
+        return {
+            "pools": pools,
+            "checkout_wait_ms": {
+                "p50": round(percentile(waits, 0.5) * 1000, 2),
+                "p99": round(percentile(waits, 0.99) * 1000, 2),
+                "max": round(max(waits) * 1000, 2) if waits else 0.0
+            }
+        }
+
+
+# Singleton instance, registered on the client in database.py
+pool_telemetry = PoolTelemetry()
@@ -0,0 +1,77 @@
+from fastapi import HTTPException, Response, status
+from bson import ObjectId
+from bson.errors import InvalidId
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+import base64
+
+
+def encode_cursor(created_at: datetime, doc_id) -> str:
+    """Opaque cursor for a (created_at, _id) position"""
+    raw = f"{created_at.isoformat()}|{doc_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, ObjectId]:
+    """Inverse of encode_cursor; raises 400 on malformed input"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, doc_id = base64.urlsafe_b64decode(padded).decode().split("|", 1)
+        return datetime.fromisoformat(created_at), ObjectId(doc_id)
+    except (ValueError, InvalidId, UnicodeDecodeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+
+def keyset_filter(
+    before: Optional[str] = None,
+    after: Optional[str] = None,
+    since: Optional[datetime] = None,
+    field: str = "created_at"
+) -> Dict:
+    """
+    Range filter for keyset pagination on (field, _id)
+
+    ``before`` selects older documents, ``after`` newer ones and ``since``
+    everything created after a timestamp. Combine with a sort on
+    ``[(field, d), ("_id", d)]`` so a compound index serves the query.
+    """
+    clauses = []
+    
+    if before:
+        created_at, doc_id = decode_cursor(before)
+        clauses.append({"$or": [
+            {field: {"$lt": created_at}},
+            {field: created_at, "_id": {"$lt": doc_id}}
+        ]})
+    
+    if after:
+        created_at, doc_id = decode_cursor(after)
+        clauses.append({"$or": [
+            {field: {"$gt": created_at}},
+            {field: created_at, "_id": {"$gt": doc_id}}
+        ]})
+    
+    if since:
+        clauses.append({field: {"$gt": since}})
+    
+    if not clauses:
+        return {}
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+def set_cursor_headers(response: Response, documents: List[Dict], field: str = "created_at"):
+    """
+    Expose page boundaries as headers so list responses stay unchanged
+
+    X-Before-Cursor points at the oldest document (for loading history),
+    X-After-Cursor at the newest (for polling deltas).
+    """
+    if not documents:
+        return
+    
+    oldest, newest = documents[0], documents[-1]
+    response.headers["X-Before-Cursor"] = encode_cursor(oldest[field], oldest["_id"])
+    response.headers["X-After-Cursor"] = encode_cursor(newest[field], newest["_id"])
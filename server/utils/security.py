@@ -1,29 +1,77 @@
 from passlib.context import CryptContext
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Tuple
 from jose import JWTError, jwt
 from config import get_settings
+from utils.cache import TTLCache
+from utils.executor import BoundedExecutor
+import hashlib
+import time
+import uuid
 
 settings = get_settings()
 
-# Password hashing context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Password hashing context; hashes made with other rounds are flagged for rehash
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.bcrypt_rounds)
+
+# bcrypt costs ~250 ms of CPU and releases the GIL, so it runs on its own
+# bounded pool; its run_ms percentiles are the hash latency in /metrics
+password_executor = BoundedExecutor(
+    name="password_hashing",
+    max_workers=settings.password_hash_workers,
+    max_queue=settings.password_hash_max_queue,
+    timeout=settings.password_hash_timeout_seconds
+)
+
+
+def _truncate(password: str) -> str:
+    # Bcrypt has a 72 byte limit, so we truncate if needed
+    if len(password.encode('utf-8')) > 72:
+        password = password[:72]
+    return password
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a plain password against a hashed password"""
-    # Bcrypt has a 72 byte limit, so we truncate if needed
-    if len(plain_password.encode('utf-8')) > 72:
-        plain_password = plain_password[:72]
-    return pwd_context.verify(plain_password, hashed_password)
+    return pwd_context.verify(_truncate(plain_password), hashed_password)
 
 
 def get_password_hash(password: str) -> str:
     """Hash a password using bcrypt (with 72 byte limit handling)"""
-    # Bcrypt has a 72 byte limit, so we truncate if needed
-    if len(password.encode('utf-8')) > 72:
-        password = password[:72]
-    return pwd_context.hash(password)
+    return pwd_context.hash(_truncate(password))
+
+
+def _verify_and_update(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    return pwd_context.verify_and_update(_truncate(plain_password), hashed_password)
+
+
+async def hash_password(password: str) -> str:
+    """
+    Hash a password on the password pool
+    
+    Raises ExecutorSaturated or asyncio.TimeoutError when the pool is overloaded.
+    """
+    return await password_executor.run(get_password_hash, password)
+
+
+async def check_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verify a password on the password pool
+    
+    Returns:
+        (valid, new_hash); new_hash is set when the stored hash uses outdated
+        parameters and should be replaced
+    """
+    return await password_executor.run(_verify_and_update, plain_password, hashed_password)
+
+
+# sha256(token) -> verified claims, each entry living until the token's exp
+token_cache = TTLCache(name="verified_tokens", maxsize=settings.token_cache_size)
+
+
+def token_digest(token: str) -> str:
+    """Digest used to key tokens so raw bearer tokens are never kept as keys"""
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -35,16 +83,34 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     else:
         expire = datetime.utcnow() + timedelta(minutes=settings.access_token_expire_minutes)
     
-    to_encode.update({"exp": expire})
+    # jti identifies the token for revocation; iat lets all of a user's
+    # earlier tokens be revoked at once
+    to_encode.update({"exp": expire, "iat": datetime.utcnow(), "jti": uuid.uuid4().hex})
     encoded_jwt = jwt.encode(to_encode, settings.secret_key, algorithm=settings.algorithm)
     
     return encoded_jwt
 
 
 def decode_access_token(token: str) -> Optional[dict]:
-    """Decode and verify a JWT token"""
+    """
+    Decode and verify a JWT token
+    
+    Verified claims are cached until the token expires, so a reused token
+    skips signature verification. Revocation is checked separately by the
+    caller and is not affected by this cache.
+    """
+    digest = token_digest(token)
+    payload = token_cache.get(digest)
+    if payload is not None:
+        return payload
+    
     try:
         payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
-        return payload
     except JWTError:
         return None
+    
+    remaining = payload.get("exp", 0) - time.time()
+    if remaining > 0:
+        token_cache.set(digest, payload, ttl=remaining)
+    
+    return payload